@@ -1,7 +1,24 @@
+import argparse
+import itertools
+import math
+import os
+import queue
+import threading
+import time
 import tkinter as tk
-from tkinter import messagebox, simpledialog, ttk
+from functools import lru_cache
+from tkinter import filedialog, messagebox, simpledialog, ttk
 from tkinter import font as tkFont
 
+from cart_engine import Catalog, Cart, CartError, CartService, OutOfStockError, Product, format_money, parse_order_text, to_paise
+from checkout import CheckoutPipeline
+from eventlog import EventLog
+from perf import METRICS
+from pricing import PricingEngine, load_promotions
+from receipt import iter_cart_lines, iter_summary_lines, iter_total_lines, write_receipt
+from snapshot import SnapshotCatalog, is_snapshot_path
+from storage import SQLiteStore, is_sqlite_path, load_catalog
+
 # Font names
 FONT_FAMILY = "Figtree"
 FALLBACK_FONT_FAMILY = "Figtree"
@@ -56,67 +73,112 @@ COMMON_HEADING_CONFIG = {
     "bg": COLOR_BACKGROUND
 }
 
+# Live product search in the Add to Cart screen
+SEARCH_DEBOUNCE_MS = 250
+SEARCH_RESULT_LIMIT = 50
+
+# Bulk order import: how many failed lines to list in the summary dialog
+BULK_SUMMARY_MAX_FAILURES = 15
+
+# How often the diagnostics panel (F12) refreshes
+DIAGNOSTICS_REFRESH_MS = 1000
+
+# Products shown per page in the product list
+PRODUCT_PAGE_SIZE = 100
+# Distinct prices whose display strings are kept
+PRICE_TEXT_CACHE_SIZE = 65_536
+
+# Items shown per page on the checkout review screen
+SUMMARY_PAGE_LINES = 200
+
+# How often the checkout screen polls the worker thread for progress
+CHECKOUT_POLL_MS = 50
+
+# How often pending stock/cart changes are written to the SQLite store
+STORE_FLUSH_MS = 2000
+
 COMMON_ENTRY_CONFIG = {
     "font": FONT_ENTRY,
     "relief": "solid",
     "bd": 1
 }
 
-# Models (Classes)
-class Product:
-    def __init__(self, id, name, price, stock):
-        if not all([isinstance(id, str), isinstance(name, str)]):
-            raise TypeError("Product ID and name must be strings.")
-        if not isinstance(price, (int, float)) or price <= 0:
-            raise ValueError("Product price must be a positive number.")
-        if not isinstance(stock, int) or stock < 0:
-            raise ValueError("Product stock must be a non-negative integer.")
-        self.id = id.strip().upper()
-        self.name = name.strip()
-        self.price = float(f"{price:.2f}")
-        self.stock = stock
-
-class CartItem:
-    def __init__(self, product: Product, quantity: int):
-        if not isinstance(product, Product):
-            raise TypeError("CartItem product must be an instance of Product.")
-        if not isinstance(quantity, int) or quantity <= 0:
-            raise ValueError("CartItem quantity must be a positive integer.")
-        self.product = product
-        self.quantity = quantity
-
-    def total_price(self):
-        return self.product.price * self.quantity
-
 # GUI Application
+@lru_cache(maxsize=PRICE_TEXT_CACHE_SIZE)
+def price_text(price_paise):
+    # Prices repeat across products and never change, so each string is formatted once
+    return format_money(price_paise)
+
+
 class OnlineCartApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, catalog_path=None, promotions_path=None, journal_dir=None, receipt_dir=None):
         super().__init__()
         self.title("ADH Cart - Online Shopping System") # Changed title
         self.configure(bg=COLOR_BACKGROUND)
         self.geometry("1200x800")
         self.bind('<Escape>', self._toggle_fullscreen)
+        self.bind('<F12>', self._toggle_diagnostics)
+        self._diagnostics_window = None
 
         self._configure_styles()
 
-        self.products = [
-            Product("P001", "Laptop", 80000.00, 15),
-            Product("P002", "Mouse", 2500.00, 50),
-            Product("P003", "Keyboard", 3400.00, 30),
-            Product("P004", "Monitor", 15000.00, 15),
-            Product("P005", "Webcam", 1700.00, 20),
-            Product("P006", "Smart Watch", 2300.00, 20),
-            Product("P007", "Speaker", 6000.00, 15),
-            Product("P008", "Mobile Phone", 25000.00,30),
-            Product("P009", "Power Bank", 1200.00, 15),
-            Product("P010","Sony Camera", 65000.00, 10)
-        ]
-        self.cart = []
-
+        self.store = None
+        self.journal = None
+        self.receipt_dir = receipt_dir
+        if receipt_dir:
+            os.makedirs(receipt_dir, exist_ok=True)
+        if catalog_path and is_snapshot_path(catalog_path):
+            start = time.perf_counter()
+            self.products = SnapshotCatalog(catalog_path)
+            print(f"Opened {len(self.products):,} product snapshot {catalog_path} in {time.perf_counter() - start:.3f}s")
+        elif catalog_path:
+            self.products = Catalog()
+            rows, seconds = load_catalog(catalog_path, self.products)
+            print(f"Loaded {rows:,} products from {catalog_path} in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/sec)")
+        else:
+            self.products = Catalog([
+                Product("P001", "Laptop", 80000.00, 15, "Computers"),
+                Product("P002", "Mouse", 2500.00, 50, "Accessories"),
+                Product("P003", "Keyboard", 3400.00, 30, "Accessories"),
+                Product("P004", "Monitor", 15000.00, 15, "Computers"),
+                Product("P005", "Webcam", 1700.00, 20, "Accessories"),
+                Product("P006", "Smart Watch", 2300.00, 20, "Wearables"),
+                Product("P007", "Speaker", 6000.00, 15, "Audio"),
+                Product("P008", "Mobile Phone", 25000.00,30, "Phones"),
+                Product("P009", "Power Bank", 1200.00, 15, "Accessories"),
+                Product("P010","Sony Camera", 65000.00, 10, "Cameras")
+            ])
+        self.pricing = load_promotions(promotions_path) if promotions_path else PricingEngine()
+        self.cart = Cart(self.pricing)
+        self.cart_service = CartService(self.products, self.cart)
+        self._search_thread = None
+        self.prepare_search()
+
+        # A SQLite catalog doubles as the persistent store for stock levels and the cart
+        if catalog_path and is_sqlite_path(catalog_path):
+            self.store = SQLiteStore(catalog_path)
+            self.cart_service.restore(self.store.load_cart(self.products))
+            self.store.watch(self.products, self.cart)
+            self.after(STORE_FLUSH_MS, self._flush_store)
+
+        # The event log replays stock and cart changes made since its last snapshot
+        if journal_dir:
+            self.journal = EventLog(journal_dir)
+            self.cart_service.recover(self.journal.state)
+            self.cart_service.journal = self.journal
+
+        self._frames = {}
         self._current_frame = None
         self._fullscreen_state = False
         self._create_main_menu()
 
+    def prepare_search(self):
+        # Builds the search index off the Tk thread; searches show the full list until it is ready
+        if self.products.search_ready or (self._search_thread is not None and self._search_thread.is_alive()):
+            return
+        self._search_thread = threading.Thread(target=self.products.prepare_search, name="search-index", daemon=True)
+        self._search_thread.start()
+
     def _configure_styles(self):
         style = ttk.Style(self)
         style.theme_use('clam')
@@ -124,21 +186,49 @@ class OnlineCartApp(tk.Tk):
         style.configure("Treeview", font=FONT_TREEVIEW_ROW, rowheight=30, background=COLOR_BACKGROUND, foreground=COLOR_TEXT, fieldbackground=COLOR_BACKGROUND) # rowheight
         style.map('Treeview', background=[('selected', COLOR_PRIMARY)])
 
+    def _flush_store(self):
+        self.store.flush()
+        self.after(STORE_FLUSH_MS, self._flush_store)
+
+    def destroy(self):
+        if self.store:
+            self.store.close()
+            self.store = None
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+        super().destroy()
+
     def _toggle_fullscreen(self, event=None):
         self._fullscreen_state = not self._fullscreen_state
         self.attributes('-fullscreen', self._fullscreen_state)
 
-    def _show_frame(self, frame_class, *args, **kwargs):
-        if self._current_frame:
-            self._current_frame.destroy()
-        self._current_frame = frame_class(self, self, *args, **kwargs)
-        self._current_frame.pack(fill="both", expand=True)
+    def _toggle_diagnostics(self, event=None):
+        if self._diagnostics_window is not None and self._diagnostics_window.winfo_exists():
+            self._diagnostics_window.destroy()
+            self._diagnostics_window = None
+        else:
+            self._diagnostics_window = DiagnosticsWindow(self)
 
-    def _get_product_by_id(self, product_id):
-        for p in self.products:
-            if p.id == product_id.strip().upper():
-                return p
-        return None
+    @METRICS.timed("ui.show_frame")
+    def _show_frame(self, frame_class, *args, **kwargs):
+        # Frames are built once and kept alive; they update themselves through observers
+        frame = self._frames.get(frame_class)
+        if frame is None:
+            with METRICS.timer(f"ui.build.{frame_class.__name__}"):
+                frame = self._frames[frame_class] = frame_class(self, self, *args, **kwargs)
+        if frame is not self._current_frame:
+            if self._current_frame:
+                self._current_frame.pack_forget()
+            frame.pack(fill="both", expand=True)
+            self._current_frame = frame
+        frame.on_show()
+
+    def _product_rows(self, start, stop):
+        return self._product_rows_at(range(start, stop))
+
+    def _product_rows_at(self, positions):
+        return [(p.id, p.name, price_text(p.price_paise), p.stock) for p in map(self.products.__getitem__, positions)]
 
     # Logic
     def display_products(self): self._show_frame(ProductDisplayFrame)
@@ -151,59 +241,157 @@ class OnlineCartApp(tk.Tk):
             messagebox.showinfo("Checkout", "Your cart is empty. Nothing to checkout.")
             return
 
-        confirm = messagebox.askyesno("Checkout Confirmation",
-                                      "Proceed with checkout?\n\n" +
-                                      self._get_cart_summary_text() +
-                                      f"\n\nFinal Total: ₹{sum(item.total_price() for item in self.cart):.2f}")
-        if confirm:
-            messagebox.showinfo("Checkout", "Order placed successfully!\nThank you for shopping with us. ~ ADH Cart") # Changed text
-            self.cart = []
-        else:
-            messagebox.showinfo("Checkout", "Checkout cancelled.")
-        self._create_main_menu()
-
-    def _get_cart_summary_text(self):
-        if not self.cart: return "Your cart is empty."
-        summary = "Your Shopping Cart:\n"
-        for i, item in enumerate(self.cart):
-            summary += f"{i+1}. {item.product.name} (Qty: {item.quantity}) - ₹{item.total_price():.2f}\n"
-        return summary.strip()
+        # Large carts are reviewed page by page instead of in one giant confirmation dialog
+        self._show_frame(CheckoutSummaryFrame)
 
    
     # Frame
     def _create_main_menu(self): self._show_frame(MainMenuFrame)
 
 
+class VirtualTreeview:
+    # Treeview that only materializes the visible window of rows (plus a small buffer).
+    # Rows come from row_provider(start, stop), which must return the rows in [start, stop).
+    # With heading_command, clicking a column heading calls heading_command(column).
+    def __init__(self, parent_frame, columns, row_count, row_provider, column_widths, headings, buffer_rows=5, scrollbar_on_right=True, heading_command=None):
+        self.row_provider = row_provider
+        self.row_count = row_count
+        self.buffer_rows = buffer_rows
+        self.offset = 0
+        self._visible_rows = 20
+
+        self.tree = ttk.Treeview(parent_frame, columns=columns, show="headings")
+        for col, heading in zip(columns, headings):
+            self.tree.heading(col, text=heading["text"], anchor=heading["anchor"])
+            if heading_command is not None:
+                self.tree.heading(col, command=lambda col=col: heading_command(col))
+            self.tree.column(col, width=column_widths.get(col, 100), anchor=heading.get("anchor", tk.W), stretch=heading.get("stretch", tk.YES))
+
+        self.vsb = ttk.Scrollbar(parent_frame, orient="vertical", command=self._on_scrollbar)
+
+        if scrollbar_on_right:
+            self.vsb.pack(side="right", fill="y")
+            self.tree.pack(side="left", fill="both", expand=True)
+        else:
+            self.tree.pack(fill="both", expand=True)
+            self.vsb.pack(fill="y")
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_by(-1 if e.delta > 0 else 1) or "break")
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-1) or "break")
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(1) or "break")
+        self.tree.bind("<Prior>", lambda e: self.scroll_by(-self._visible_rows) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll_by(self._visible_rows) or "break")
+        self._render()
+
+    def _max_offset(self):
+        return max(0, self.row_count - self._visible_rows)
+
+    def _on_resize(self, event):
+        rowheight = int(ttk.Style(self.tree).lookup("Treeview", "rowheight") or 20)
+        visible = max(1, event.height // rowheight - 1)  # minus the heading row
+        if visible != self._visible_rows:
+            self._visible_rows = visible
+            self.scroll_to(self.offset)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.row_count))
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self._visible_rows)
+        else:
+            self.scroll_by(int(amount))
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def scroll_to(self, offset):
+        offset = min(max(0, offset), self._max_offset())
+        if offset != self.offset:
+            self.offset = offset
+            self.tree.selection_set(())
+        self._render()
+
+    @METRICS.timed("ui.treeview.render")
+    def _render(self):
+        window = self._visible_rows + self.buffer_rows
+        rows = self.row_provider(self.offset, min(self.row_count, self.offset + window))
+        METRICS.gauge("ui.treeview.materialized_rows", len(rows))
+        for i, row_data in enumerate(rows):
+            iid = str(i)
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=row_data)
+            else:
+                self.tree.insert("", tk.END, iid=iid, values=row_data)
+        for i in range(len(rows), window):
+            if self.tree.exists(str(i)):
+                self.tree.delete(str(i))
+        self.tree.yview_moveto(0)
+
+        if self.row_count:
+            self.vsb.set(self.offset / self.row_count, min(1.0, (self.offset + self._visible_rows) / self.row_count))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def refresh(self, row_count=None):
+        if row_count is not None:
+            self.row_count = row_count
+        self.offset = min(self.offset, self._max_offset())
+        self._render()
+
+    def set_rows(self, row_provider, row_count):
+        # Swaps the data source (e.g. search results) and jumps back to the top
+        self.row_provider = row_provider
+        self.row_count = row_count
+        self.offset = 0
+        self.tree.selection_set(())
+        self._render()
+
+    def refresh_row(self, index):
+        # Updates a single row in place if it is currently materialized
+        iid = str(index - self.offset)
+        if self.tree.exists(iid):
+            self.tree.item(iid, values=self.row_provider(index, index + 1)[0])
+
+    def row_index(self, iid):
+        return self.offset + int(iid)
+
+
 class BaseFrame(tk.Frame):
     def __init__(self, parent, app_instance, title_text=None):
         super().__init__(parent, bg=COLOR_BACKGROUND)
         self.app = app_instance
+        self._subscriptions = []
         if title_text:
             tk.Label(self, text=title_text, **COMMON_HEADING_CONFIG).pack(pady=20)
 
+    def on_show(self):
+        pass
+
+    def _subscribe(self, observable, callback):
+        observable.subscribe(callback)
+        self._subscriptions.append((observable, callback))
+
+    def destroy(self):
+        for observable, callback in self._subscriptions:
+            observable.unsubscribe(callback)
+        self._subscriptions = []
+        super().destroy()
+
     def _create_back_button(self, command=None, text="Back to Main Menu", pady=30):
         if command is None:
             command = self.app._create_main_menu
         tk.Button(self, text=text, command=command, **COMMON_BACK_BUTTON_CONFIG).pack(pady=pady)
 
-    def _create_treeview(self, parent_frame, columns, data, column_widths, headings, scrollbar_on_right=True):
-        tree = ttk.Treeview(parent_frame, columns=columns, show="headings")
-        for col, heading in zip(columns, headings):
-            tree.heading(col, text=heading["text"], anchor=heading["anchor"])
-            tree.column(col, width=column_widths.get(col, 100), anchor=heading.get("anchor", tk.W), stretch=heading.get("stretch", tk.YES))
-        for row_data in data:
-            tree.insert("", tk.END, values=row_data)
-
-        vsb = ttk.Scrollbar(parent_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=vsb.set)
+    def _create_virtual_treeview(self, parent_frame, columns, row_count, row_provider, column_widths, headings, scrollbar_on_right=True):
+        return VirtualTreeview(parent_frame, columns, row_count, row_provider, column_widths, headings, scrollbar_on_right=scrollbar_on_right)
 
-        if scrollbar_on_right:
-            vsb.pack(side="right", fill="y")
-            tree.pack(side="left", fill="both", expand=True)
+    def _on_catalog_change(self, event, index):
+        # Shared by the product tables: stock edits touch one row, additions resize the table
+        if event == "stock":
+            self.product_table.refresh_row(index)
         else:
-            tree.pack(fill="both", expand=True)
-            vsb.pack(fill="y")
-        return tree
+            self.product_table.refresh(len(self.app.products))
 
 
 class MainMenuFrame(BaseFrame):
@@ -230,34 +418,153 @@ class MainMenuFrame(BaseFrame):
 
 
 class ProductDisplayFrame(BaseFrame):
+    # Sorted, filtered and paged product list. Orders and ranges come from the catalog's
+    # pre-sorted indexes (Catalog.query), so re-sorting never touches more than one page of rows.
+    SORT_KEYS = {"ID": "position", "Name": "name", "Price": "price", "Stock": "stock"}
+
     def __init__(self, parent, app_instance):
         super().__init__(parent, app_instance, title_text="Available Products")
+        self.sort_column = "ID"
+        self.descending = False
+        self.price_range = None
+        self.stock_range = None
+        self.page = 0
+        self.view = range(0)
 
         if not self.app.products:
             tk.Label(self, text="No products available.", **COMMON_LABEL_CONFIG).pack(pady=10)
         else:
+            self._create_filter_bar()
             tree_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
             tree_frame.pack(pady=10, padx=20, fill="both", expand=True)
 
-            columns = ("ID", "Name", "Price", "Stock")
-            headings = [
+            self.columns = ("ID", "Name", "Price", "Stock")
+            self.headings = [
                 {"text": "ID", "anchor": tk.CENTER, "stretch": tk.NO},
                 {"text": "Name", "anchor": tk.W},
                 {"text": "Price", "anchor": tk.E, "stretch": tk.NO},
                 {"text": "Stock", "anchor": tk.CENTER, "stretch": tk.NO}
             ]
             column_widths = {"ID": 70, "Name": 250, "Price": 120, "Stock": 80}
-            data = [(p.id, p.name, f"₹{p.price:.2f}", p.stock) for p in self.app.products]
 
-            self._create_treeview(tree_frame, columns, data, column_widths, headings)
+            self.product_table = VirtualTreeview(tree_frame, self.columns, 0, self._page_rows, column_widths, self.headings, heading_command=self._sort_action)
+            self._create_page_bar()
+            self._subscribe(self.app.products, self._on_catalog_change)
+            self._apply_view()
 
         self._create_back_button()
 
+    def _create_filter_bar(self):
+        filter_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        filter_frame.pack(pady=(0, 5))
+        self.filter_entries = {}
+        for column, label in ((0, "Price (\u20b9):"), (5, "Stock:")):
+            tk.Label(filter_frame, text=label, **COMMON_LABEL_CONFIG).grid(row=0, column=column, padx=(15, 5))
+            low = tk.Entry(filter_frame, width=8, **COMMON_ENTRY_CONFIG)
+            low.grid(row=0, column=column + 1)
+            tk.Label(filter_frame, text="to", **COMMON_LABEL_CONFIG).grid(row=0, column=column + 2, padx=5)
+            high = tk.Entry(filter_frame, width=8, **COMMON_ENTRY_CONFIG)
+            high.grid(row=0, column=column + 3)
+            self.filter_entries[label] = (low, high)
+        tk.Button(filter_frame, text="Filter", command=self._filter_action, **COMMON_BUTTON_CONFIG).grid(row=0, column=10, padx=(20, 5))
+        tk.Button(filter_frame, text="Clear", command=self._clear_filters_action, **COMMON_BUTTON_CONFIG).grid(row=0, column=11, padx=5)
+
+    def _create_page_bar(self):
+        page_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        page_frame.pack(pady=5)
+        self.page_buttons = []
+        for text, target in (("<<", lambda: 0), ("<", lambda: self.page - 1)):
+            button = tk.Button(page_frame, text=text, command=lambda target=target: self._go_to_page(target()), **COMMON_BUTTON_CONFIG)
+            button.pack(side="left", padx=5)
+            self.page_buttons.append(button)
+        self.page_label = tk.Label(page_frame, **COMMON_LABEL_CONFIG)
+        self.page_label.pack(side="left", padx=15)
+        for text, target in ((">", lambda: self.page + 1), (">>", lambda: self._page_count() - 1)):
+            button = tk.Button(page_frame, text=text, command=lambda target=target: self._go_to_page(target()), **COMMON_BUTTON_CONFIG)
+            button.pack(side="left", padx=5)
+            self.page_buttons.append(button)
+
+    # View
+    def _apply_view(self, keep_page=False):
+        self.view = self.app.products.query(self.SORT_KEYS[self.sort_column], self.descending, self.price_range, self.stock_range)
+        for col, heading in zip(self.columns, self.headings):
+            arrow = (" \u25bc" if self.descending else " \u25b2") if col == self.sort_column else ""
+            self.product_table.tree.heading(col, text=heading["text"] + arrow)
+        if keep_page:
+            self._go_to_page(self.page, keep_scroll=True)
+        else:
+            self._go_to_page(0)
+
+    def _page_count(self):
+        return max(1, math.ceil(len(self.view) / PRODUCT_PAGE_SIZE))
+
+    def _go_to_page(self, page, keep_scroll=False):
+        self.page = max(0, min(page, self._page_count() - 1))
+        start = self.page * PRODUCT_PAGE_SIZE
+        rows = min(PRODUCT_PAGE_SIZE, len(self.view) - start)
+        if keep_scroll:
+            self.product_table.refresh(rows)
+        else:
+            self.product_table.set_rows(self._page_rows, rows)
+        shown = f"{start + 1:,}-{start + rows:,} of {len(self.view):,}" if rows else "No matching products"
+        self.page_label.config(text=f"Page {self.page + 1:,} of {self._page_count():,}  ({shown})")
+        first, previous, following, last = self.page_buttons
+        for button, enabled in ((first, self.page > 0), (previous, self.page > 0),
+                                (following, self.page < self._page_count() - 1), (last, self.page < self._page_count() - 1)):
+            button.config(state=tk.NORMAL if enabled else tk.DISABLED)
+
+    def _page_rows(self, start, stop):
+        offset = self.page * PRODUCT_PAGE_SIZE
+        return self.app._product_rows_at(self.view[offset + start:offset + stop])
+
+    def _on_catalog_change(self, event, index):
+        # Stock changes only reorder or refilter views that depend on stock; otherwise the visible rows are refreshed
+        if event != "stock" or self.sort_column == "Stock" or self.stock_range is not None:
+            self._apply_view(keep_page=True)
+        else:
+            self.product_table.refresh()
+
+    # Actions
+    def _sort_action(self, column):
+        if column == self.sort_column:
+            self.descending = not self.descending
+        else:
+            self.sort_column, self.descending = column, False
+        self._apply_view()
+
+    def _read_range(self, label, parse):
+        bounds = []
+        for entry in self.filter_entries[label]:
+            text = entry.get().strip()
+            bounds.append(parse(text) if text else None)
+        return None if bounds == [None, None] else tuple(bounds)
+
+    def _filter_action(self):
+        try:
+            price_range = self._read_range("Price (\u20b9):", lambda text: to_paise(float(text)))
+            stock_range = self._read_range("Stock:", int)
+        except (ValueError, OverflowError):  # float("inf") parses but cannot be rounded to paise
+            messagebox.showerror("Input Error", "Price and stock filters must be numbers (stock a whole number).")
+            return
+        self.price_range, self.stock_range = price_range, stock_range
+        self._apply_view()
+
+    def _clear_filters_action(self):
+        for low, high in self.filter_entries.values():
+            low.delete(0, tk.END)
+            high.delete(0, tk.END)
+        self.price_range = self.stock_range = None
+        self._apply_view()
+
 
 class AddToCartFrame(BaseFrame):
     def __init__(self, parent, app_instance):
         super().__init__(parent, app_instance, title_text="Add Product to Cart")
 
+        self._search_results = None
+        self._search_rows = {}
+        self._search_job = None
+        self._create_search_box()
         self._create_product_list_treeview()
 
         input_section_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
@@ -271,9 +578,74 @@ class AddToCartFrame(BaseFrame):
         self.quantity_entry = tk.Entry(input_section_frame, width=25, **COMMON_ENTRY_CONFIG)
         self.quantity_entry.grid(row=1, column=1, padx=10, pady=10)
 
-        tk.Button(self, text="Add to Cart", command=self._add_to_cart_action, **COMMON_BUTTON_CONFIG).pack(pady=10)
+        action_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        action_frame.pack(pady=10)
+        tk.Button(action_frame, text="Add to Cart", command=self._add_to_cart_action, **COMMON_BUTTON_CONFIG).pack(side="left", padx=10)
+        tk.Button(action_frame, text="Bulk Add...", command=lambda: BulkAddDialog(self.app), **COMMON_BUTTON_CONFIG).pack(side="left", padx=10)
         self._create_back_button(pady=5)
 
+    def on_show(self):
+        self.product_id_entry.delete(0, tk.END)
+        self.quantity_entry.delete(0, tk.END)
+
+    def _create_search_box(self):
+        search_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        search_frame.pack(pady=(0, 5))
+        tk.Label(search_frame, text="Search:", **COMMON_LABEL_CONFIG).pack(side="left", padx=10)
+        self.search_entry = tk.Entry(search_frame, width=40, **COMMON_ENTRY_CONFIG)
+        self.search_entry.pack(side="left", padx=10)
+        self.search_entry.bind("<KeyRelease>", self._schedule_search)
+        self.search_status = tk.Label(search_frame, text="", **COMMON_LABEL_CONFIG)
+        self.search_status.pack(side="left", padx=10)
+
+    def _schedule_search(self, event=None):
+        # Debounce: only search once typing pauses for SEARCH_DEBOUNCE_MS
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DEBOUNCE_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_job = None
+        if not self.app.products:
+            return
+        query = self.search_entry.get().strip()
+        ready = self.app.products.search_ready
+        self.search_status.config(text="" if ready or not query else "Indexing products...")
+        if not query or not ready:
+            if self._search_results is not None:
+                self._search_results = None
+                self._search_rows = {}
+                self.product_table.set_rows(self.app._product_rows, len(self.app.products))
+            if query:
+                # Retry once the background index build finishes
+                self.app.prepare_search()
+                self._search_job = self.after(SEARCH_DEBOUNCE_MS, self._run_search)
+            return
+        self._search_results = self.app.products.search(query, limit=SEARCH_RESULT_LIMIT)
+        self._search_rows = {p.id: row for row, p in enumerate(self._search_results)}
+        self.product_table.set_rows(self._result_rows, len(self._search_results))
+
+    def _result_rows(self, start, stop):
+        return [(p.id, p.name, price_text(p.price_paise), p.stock) for p in self._search_results[start:stop]]
+
+    def _on_catalog_change(self, event, index):
+        if self._search_results is None:
+            super()._on_catalog_change(event, index)
+        elif event == "stock":
+            row = self._search_rows.get(self.app.products[index].id)
+            if row is not None:
+                self.product_table.refresh_row(row)
+        else:
+            self._run_search()
+
+    def _on_product_select(self, event):
+        selected_items = self.product_table.tree.selection()
+        if selected_items:
+            values = self.product_table.tree.item(selected_items[0], "values")
+            self.product_id_entry.delete(0, tk.END)
+            self.product_id_entry.insert(0, values[0])
+            self.quantity_entry.focus_set()
+
     def _create_product_list_treeview(self):
         if not self.app.products:
             tk.Label(self, text="No products available to add.", **COMMON_LABEL_CONFIG).pack(pady=5)
@@ -290,9 +662,10 @@ class AddToCartFrame(BaseFrame):
             {"text": "Stock", "anchor": tk.CENTER, "stretch": tk.NO}
         ]
         column_widths = {"ID": 70, "Name": 250, "Price": 120, "Stock": 80}
-        data = [(p.id, p.name, f"₹{p.price:.2f}", p.stock) for p in self.app.products]
 
-        self._create_treeview(tree_frame, columns, data, column_widths, headings)
+        self.product_table = self._create_virtual_treeview(tree_frame, columns, len(self.app.products), self.app._product_rows, column_widths, headings)
+        self.product_table.tree.bind("<<TreeviewSelect>>", self._on_product_select)
+        self._subscribe(self.app.products, self._on_catalog_change)
 
     def _add_to_cart_action(self):
         product_id = self.product_id_entry.get().strip().upper()
@@ -309,64 +682,341 @@ class AddToCartFrame(BaseFrame):
             messagebox.showerror("Input Error", "Quantity must be a positive whole number.")
             return
 
-        product_found = self.app._get_product_by_id(product_id)
-        if not product_found:
-            messagebox.showerror("Error", f"Product with ID '{product_id}' not found.")
+        try:
+            item = self.app.cart_service.add(product_id, quantity)
+        except OutOfStockError as e:
+            messagebox.showinfo(e.title, str(e))
             return
-        if product_found.stock == 0:
-            messagebox.showinfo("Out of Stock", f"Sorry, '{product_found.name}' is out of stock.")
+        except CartError as e:
+            messagebox.showerror(e.title, str(e))
+            return
+
+        messagebox.showinfo("Success", f"'{quantity}' of '{item.product.name}' added to cart.")
+        self.product_id_entry.delete(0, tk.END)
+        self.quantity_entry.delete(0, tk.END)
+
+
+class CheckoutSummaryFrame(BaseFrame):
+    # Checkout confirmation: only the current page of items is rendered into the text view
+    def __init__(self, parent, app_instance):
+        super().__init__(parent, app_instance, title_text="Review Your Order")
+        self.page = 0
+
+        text_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        text_frame.pack(pady=10, padx=20, fill="both", expand=True)
+        self.summary_text = tk.Text(text_frame, height=18, wrap="none", font=FONT_TREEVIEW_ROW, relief="solid", bd=1)
+        vsb = ttk.Scrollbar(text_frame, orient="vertical", command=self.summary_text.yview)
+        self.summary_text.configure(yscrollcommand=vsb.set)
+        vsb.pack(side="right", fill="y")
+        self.summary_text.pack(side="left", fill="both", expand=True)
+
+        page_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        page_frame.pack(pady=5)
+        self.prev_button = tk.Button(page_frame, text="< Previous", command=lambda: self._go_to_page(self.page - 1), **COMMON_BUTTON_CONFIG)
+        self.prev_button.pack(side="left", padx=10)
+        self.page_label = tk.Label(page_frame, **COMMON_LABEL_CONFIG)
+        self.page_label.pack(side="left", padx=10)
+        self.next_button = tk.Button(page_frame, text="Next >", command=lambda: self._go_to_page(self.page + 1), **COMMON_BUTTON_CONFIG)
+        self.next_button.pack(side="left", padx=10)
+
+        self.total_label = tk.Label(self, justify=tk.CENTER, **COMMON_HEADING_CONFIG)
+        self.total_label.pack(pady=(15, 5))
+
+        button_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        button_frame.pack(pady=15)
+        tk.Button(button_frame, text="Place Order", command=lambda: self.app._show_frame(CheckoutFrame), **COMMON_BUTTON_CONFIG).pack(side="left", padx=10)
+        tk.Button(button_frame, text="Save Summary...", command=self._export_action, **COMMON_BUTTON_CONFIG).pack(side="left", padx=10)
+        tk.Button(button_frame, text="Cancel Checkout", command=self._cancel_action, **COMMON_BACK_BUTTON_CONFIG).pack(side="left", padx=10)
+
+    def on_show(self):
+        cart = self.app.cart
+        self.total_label.config(text="\n".join(iter_total_lines(cart.coupon, cart.discount_paise, cart.total_paise)))
+        self._go_to_page(0)
+
+    def _page_count(self):
+        return max(1, math.ceil(len(self.app.cart) / SUMMARY_PAGE_LINES))
+
+    def _go_to_page(self, page):
+        self.page = max(0, min(page, self._page_count() - 1))
+        start = self.page * SUMMARY_PAGE_LINES
+        stop = min(start + SUMMARY_PAGE_LINES, len(self.app.cart))
+
+        self.summary_text.config(state=tk.NORMAL)
+        self.summary_text.delete("1.0", tk.END)
+        self.summary_text.insert("1.0", "\n".join(iter_cart_lines(self.app.cart, start, stop)))
+        self.summary_text.config(state=tk.DISABLED)
+
+        self.page_label.config(text=f"Items {start + 1}-{stop} of {len(self.app.cart):,}  (page {self.page + 1} of {self._page_count():,})")
+        self.prev_button.config(state=tk.NORMAL if self.page > 0 else tk.DISABLED)
+        self.next_button.config(state=tk.NORMAL if self.page < self._page_count() - 1 else tk.DISABLED)
+
+    def _export_action(self):
+        path = filedialog.asksaveasfilename(title="Save Order Summary", defaultextension=".txt", filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if path:
+            cart = self.app.cart
+            lines = itertools.chain(iter_summary_lines(cart), ("",), iter_total_lines(cart.coupon, cart.discount_paise, cart.total_paise))
+            write_receipt(path, lines, title="ADH Cart Order Summary")
+            messagebox.showinfo("Checkout", f"Summary saved to {path}.")
+
+    def _cancel_action(self):
+        messagebox.showinfo("Checkout", "Checkout cancelled.")
+        self.app._create_main_menu()
+
+
+class CheckoutFrame(BaseFrame):
+    # Runs the checkout pipeline on a worker thread and polls it with after(), so the window stays responsive
+    def __init__(self, parent, app_instance):
+        super().__init__(parent, app_instance, title_text="Placing Your Order")
+        self.pipeline = None
+
+        self.status_label = tk.Label(self, **COMMON_LABEL_CONFIG)
+        self.status_label.pack(pady=10)
+        self.progress_bar = ttk.Progressbar(self, orient="horizontal", length=500, mode="determinate", maximum=1.0)
+        self.progress_bar.pack(pady=10)
+        self.cancel_button = tk.Button(self, text="Cancel Checkout", command=self._cancel_action, **COMMON_BACK_BUTTON_CONFIG)
+        self.cancel_button.pack(pady=30)
+
+    def on_show(self):
+        order_sink = self.app.store.save_order if self.app.store else None
+        self.pipeline = CheckoutPipeline(self.app.cart_service, order_sink=order_sink, receipt_dir=self.app.receipt_dir)
+        self.progress_bar["value"] = 0
+        self.status_label.config(text="Starting checkout...")
+        self.cancel_button.config(state=tk.NORMAL)
+        self.pipeline.start()
+        self.after(CHECKOUT_POLL_MS, self._poll)
+
+    def _cancel_action(self):
+        self.pipeline.cancel()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_label.config(text="Cancelling...")
+
+    def _poll(self):
+        while True:
+            try:
+                event = self.pipeline.events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == "progress":
+                _, fraction, stage = event
+                self.progress_bar["value"] = fraction
+                self.status_label.config(text=f"{stage}...")
+                if stage != CheckoutPipeline.STAGES[0]:
+                    self.cancel_button.config(state=tk.DISABLED)
+            elif kind == "done":
+                self.pipeline.finish()
+                message = f"Order placed successfully!\nOrder number: {self.pipeline.order_id}\nThank you for shopping with us. ~ ADH Cart"
+                receipt_path = event[1]
+                if self.pipeline.receipt_error:
+                    message += f"\n\nThe receipt could not be saved: {self.pipeline.receipt_error}"
+                if receipt_path:
+                    messagebox.showinfo("Checkout", f"{message}\n\nReceipt saved to {receipt_path}.")
+                elif messagebox.askyesno("Checkout", f"{message}\n\nSave a copy of your receipt?"):
+                    self._save_receipt()
+                self.app._create_main_menu()
+                return
+            elif kind == "cancelled":
+                messagebox.showinfo("Checkout", "Checkout cancelled.")
+                self.app._create_main_menu()
+                return
+            else:
+                messagebox.showerror("Checkout Failed", event[1])
+                self.app._create_main_menu()
+                return
+        self.after(CHECKOUT_POLL_MS, self._poll)
+
+    def _save_receipt(self):
+        path = filedialog.asksaveasfilename(title="Save Receipt", initialfile=f"receipt-{self.pipeline.order_id}.txt", defaultextension=".txt",
+                                            filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if path:
+            write_receipt(path, self.pipeline.receipt_lines(), title=f"ADH Cart Receipt {self.pipeline.order_id}")
+
+
+class DiagnosticsWindow(tk.Toplevel):
+    # Opt-in performance panel (F12); opening it turns instrumentation on
+    def __init__(self, app_instance):
+        super().__init__(app_instance, bg=COLOR_BACKGROUND)
+        self.app = app_instance
+        self.title("ADH Cart - Diagnostics")
+        self.geometry("900x500")
+        METRICS.enabled = True
+
+        tree_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        tree_frame.pack(padx=20, pady=(20, 10), fill="both", expand=True)
+        columns = ("Metric", "Count", "p50", "p99", "Max")
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        for col, width in zip(columns, (300, 80, 100, 100, 100)):
+            self.tree.heading(col, text=col if col in ("Metric", "Count") else f"{col} (ms)", anchor=tk.W if col == "Metric" else tk.E)
+            self.tree.column(col, width=width, anchor=tk.W if col == "Metric" else tk.E)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        vsb.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.summary_label = tk.Label(self, justify=tk.LEFT, anchor="w", **COMMON_LABEL_CONFIG)
+        self.summary_label.pack(padx=20, fill="x")
+
+        button_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        button_frame.pack(pady=15)
+        tk.Button(button_frame, text="Export...", command=self._export_action, **COMMON_BUTTON_CONFIG).pack(side="left", padx=10)
+        tk.Button(button_frame, text="Reset", command=METRICS.reset, **COMMON_BUTTON_CONFIG).pack(side="left", padx=10)
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        self._refresh_job = None
+        self._refresh()
+
+    def destroy(self):
+        # Cancel the pending refresh so it never fires against a destroyed window
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        super().destroy()
+
+    def _widget_count(self):
+        count, pending = 0, [self.app]
+        while pending:
+            children = pending.pop().winfo_children()
+            count += len(children)
+            pending.extend(children)
+        return count
+
+    def _refresh(self):
+        if not self.winfo_exists():
             return
+        for name, stat in sorted(METRICS.stats().items()):
+            values = (name, stat["count"], f"{stat['p50_ms']:.3f}", f"{stat['p99_ms']:.3f}", f"{stat['max_ms']:.3f}")
+            if self.tree.exists(name):
+                self.tree.item(name, values=values)
+            else:
+                self.tree.insert("", tk.END, iid=name, values=values)
+
+        details = [f"Widgets: {self._widget_count()}", f"Products: {len(self.app.products):,}", f"Cart lines: {len(self.app.cart):,}"]
+        details += [f"{name}: {value}" for name, value in sorted({**METRICS.gauges(), **METRICS.counters()}.items())]
+        self.summary_label.config(text="   ".join(details))
+        self._refresh_job = self.after(DIAGNOSTICS_REFRESH_MS, self._refresh)
+
+    def _export_action(self):
+        path = filedialog.asksaveasfilename(parent=self, title="Export Metrics", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("CSV", "*.csv")])
+        if path:
+            METRICS.export(path)
+            messagebox.showinfo("Diagnostics", f"Metrics exported to {path}.", parent=self)
+
+
+class BulkAddDialog(tk.Toplevel):
+    def __init__(self, app_instance):
+        super().__init__(app_instance, bg=COLOR_BACKGROUND)
+        self.app = app_instance
+        self.title("Bulk Add to Cart")
+        self.transient(app_instance)
+        # Modal, so the cart cannot be changed from here while another screen starts a checkout
+        self.grab_set()
 
-        # Check existing quantity in cart
-        existing_cart_item = next((item for item in self.app.cart if item.product.id == product_id), None)
-        current_cart_quantity = existing_cart_item.quantity if existing_cart_item else 0
-        total_requested_quantity = current_cart_quantity + quantity
+        tk.Label(self, text="Paste one 'Product ID, Quantity' per line:", **COMMON_LABEL_CONFIG).pack(padx=20, pady=(20, 10))
+        self.order_text = tk.Text(self, width=50, height=15, font=FONT_ENTRY, relief="solid", bd=1)
+        self.order_text.pack(padx=20, fill="both", expand=True)
 
-        if total_requested_quantity > product_found.stock + current_cart_quantity:
-            messagebox.showerror("Not Enough Stock", f"Error: Only {product_found.stock} of '{product_found.name}' available (already {current_cart_quantity} in cart).")
+        button_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        button_frame.pack(pady=20)
+        tk.Button(button_frame, text="Load File...", command=self._load_file, **COMMON_BUTTON_CONFIG).pack(side="left", padx=10)
+        tk.Button(button_frame, text="Add All", command=self._add_all_action, **COMMON_BUTTON_CONFIG).pack(side="left", padx=10)
+        tk.Button(button_frame, text="Cancel", command=self.destroy, **COMMON_BACK_BUTTON_CONFIG).pack(side="left", padx=10)
+        self.order_text.focus_set()
+
+    def _load_file(self):
+        path = filedialog.askopenfilename(parent=self, title="Open Order File", filetypes=[("Order files", "*.csv *.txt"), ("All files", "*.*")])
+        if path:
+            with open(path, encoding="utf-8") as f:
+                self.order_text.delete("1.0", tk.END)
+                self.order_text.insert("1.0", f.read())
+
+    def _add_all_action(self):
+        text = self.order_text.get("1.0", tk.END)
+        lines, errors = parse_order_text(text)
+        if not lines and not errors:
+            messagebox.showerror("Input Error", "Please enter at least one order line.", parent=self)
             return
 
-        if existing_cart_item:
-            existing_cart_item.quantity += quantity
+        added, failures = self.app.cart_service.add_many((product_id, quantity) for _, product_id, quantity in lines)
+        problems = sorted(errors + [(lines[i][0], message) for i, _, message in failures])
+
+        summary = f"Added {added} item(s) from {len(lines) - len(failures)} of {len(lines) + len(errors)} line(s)."
+        if problems:
+            summary += "\n\nProblems:\n" + "\n".join(f"Line {line_number}: {message}" for line_number, message in problems[:BULK_SUMMARY_MAX_FAILURES])
+            if len(problems) > BULK_SUMMARY_MAX_FAILURES:
+                summary += f"\n... and {len(problems) - BULK_SUMMARY_MAX_FAILURES} more."
+            # Keep only the failed lines so pressing Add All again cannot add the others twice
+            raw_lines = text.splitlines()
+            self.order_text.delete("1.0", tk.END)
+            self.order_text.insert("1.0", "\n".join(raw_lines[line_number - 1] for line_number in sorted({n for n, _ in problems})))
+            summary += "\n\nThe lines that could not be added are left in the box."
+            messagebox.showwarning("Bulk Add", summary, parent=self)
         else:
-            self.app.cart.append(CartItem(product_found, quantity))
-
-        product_found.stock -= quantity
-        messagebox.showinfo("Success", f"'{quantity}' of '{product_found.name}' added to cart.")
-        self.product_id_entry.delete(0, tk.END)
-        self.quantity_entry.delete(0, tk.END)
-        self.app._show_frame(AddToCartFrame)
+            messagebox.showinfo("Bulk Add", summary, parent=self)
+            self.destroy()
 
 
 class CartDisplayFrame(BaseFrame):
     def __init__(self, parent, app_instance):
         super().__init__(parent, app_instance, title_text="Your Shopping Cart")
 
-        if not self.app.cart:
-            tk.Label(self, text="Your cart is empty.", **COMMON_LABEL_CONFIG).pack(pady=10)
-        else:
-            cart_tree_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
-            cart_tree_frame.pack(pady=10, padx=20, fill="both", expand=True)
-
-            columns = ("Product", "Quantity", "Price/Item", "Subtotal")
-            headings = [
-                {"text": "Product", "anchor": tk.W},
-                {"text": "Qty", "anchor": tk.CENTER},
-                {"text": "Price/Item", "anchor": tk.E},
-                {"text": "Subtotal", "anchor": tk.E}
-            ]
-            column_widths = {"Product": 250, "Quantity": 80, "Price/Item": 120, "Subtotal": 120}
+        self.empty_label = tk.Label(self, text="Your cart is empty.", **COMMON_LABEL_CONFIG)
+        self.cart_tree_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+
+        columns = ("Product", "Quantity", "Price/Item", "Subtotal")
+        headings = [
+            {"text": "Product", "anchor": tk.W},
+            {"text": "Qty", "anchor": tk.CENTER},
+            {"text": "Price/Item", "anchor": tk.E},
+            {"text": "Subtotal", "anchor": tk.E}
+        ]
+        column_widths = {"Product": 250, "Quantity": 80, "Price/Item": 120, "Subtotal": 120}
 
-            total_cart_price = 0
-            data = []
-            for item in self.app.cart:
-                data.append((item.product.name, item.quantity, f"₹{item.product.price:.2f}", f"₹{item.total_price():.2f}"))
-                total_cart_price += item.total_price()
+        self.cart_table = self._create_virtual_treeview(self.cart_tree_frame, columns, len(self.app.cart), self._cart_rows, column_widths, headings)
+        self.total_label = tk.Label(self, **COMMON_HEADING_CONFIG)
 
-            self._create_treeview(cart_tree_frame, columns, data, column_widths, headings)
-            tk.Label(self, text=f"Total Cart Value: ₹{total_cart_price:.2f}", **COMMON_HEADING_CONFIG).pack(pady=20)
+        self.coupon_frame = tk.Frame(self, bg=COLOR_BACKGROUND)
+        tk.Label(self.coupon_frame, text="Coupon:", **COMMON_LABEL_CONFIG).pack(side="left", padx=10)
+        self.coupon_entry = tk.Entry(self.coupon_frame, width=20, **COMMON_ENTRY_CONFIG)
+        self.coupon_entry.pack(side="left", padx=10)
+        tk.Button(self.coupon_frame, text="Apply", command=self._apply_coupon_action, **COMMON_BUTTON_CONFIG).pack(side="left", padx=10)
 
+        self.back_button_anchor = tk.Frame(self, bg=COLOR_BACKGROUND)
+        self.back_button_anchor.pack()
         self._create_back_button()
+        self._subscribe(self.app.cart, self._on_cart_change)
+        self._on_cart_change("clear", None)
+
+    def _cart_rows(self, start, stop):
+        return [(item.product.name, item.quantity, price_text(item.product.price_paise), format_money(item.total_paise())) for item in (self.app.cart[i] for i in range(start, stop))]
+
+    def _on_cart_change(self, event, index):
+        if event == "update":
+            self.cart_table.refresh_row(index)
+        else:
+            self.cart_table.refresh(len(self.app.cart))
+
+        if not self.app.cart:
+            self.cart_tree_frame.pack_forget()
+            self.total_label.pack_forget()
+            self.coupon_frame.pack_forget()
+            self.empty_label.pack(pady=10, before=self.back_button_anchor)
+        else:
+            self.empty_label.pack_forget()
+            self.cart_tree_frame.pack(pady=10, padx=20, fill="both", expand=True, before=self.back_button_anchor)
+            self.total_label.pack(pady=(20, 5), before=self.back_button_anchor)
+            self.coupon_frame.pack(pady=5, before=self.back_button_anchor)
+            total_text = f"Total Cart Value: {format_money(self.app.cart.total_paise)}"
+            if self.app.cart.discount_paise:
+                total_text += f"  (Coupon {self.app.cart.coupon}: -{format_money(self.app.cart.discount_paise)})"
+            self.total_label.config(text=total_text)
+
+    def _apply_coupon_action(self):
+        try:
+            self.app.cart_service.apply_coupon(self.coupon_entry.get())
+        except CartError as e:
+            messagebox.showerror(e.title, str(e))
+            return
+        self.coupon_entry.delete(0, tk.END)
 
 class UpdateCartItemFrame(BaseFrame):
     def __init__(self, parent, app_instance):
@@ -390,12 +1040,13 @@ class UpdateCartItemFrame(BaseFrame):
         tk.Button(self, text="Update Quantity", command=self._update_quantity_action, **COMMON_BUTTON_CONFIG).pack(pady=10)
         self._create_back_button(pady=5)
 
-    def _populate_cart_tree(self):
-        for widget in self.cart_tree_frame.winfo_children(): widget.destroy()
+    def on_show(self):
+        self.item_number_entry.delete(0, tk.END)
+        self.new_quantity_entry.delete(0, tk.END)
 
-        if not self.app.cart:
-            tk.Label(self.cart_tree_frame, text="Your cart is empty. Nothing to update.", **COMMON_LABEL_CONFIG).pack(pady=10)
-            return
+    def _populate_cart_tree(self):
+        self.empty_label = tk.Label(self.cart_tree_frame, text="Your cart is empty. Nothing to update.", **COMMON_LABEL_CONFIG)
+        self.table_frame = tk.Frame(self.cart_tree_frame, bg=COLOR_BACKGROUND)
 
         columns = ("Index", "Product", "Current Quantity", "Price/Item", "Subtotal")
         headings = [
@@ -406,15 +1057,33 @@ class UpdateCartItemFrame(BaseFrame):
             {"text": "Subtotal", "anchor": tk.E}
         ]
         column_widths = {"Index": 50, "Product": 200, "Current Quantity": 100, "Price/Item": 100, "Subtotal": 100}
-        data = [(i+1, item.product.name, item.quantity, f"₹{item.product.price:.2f}", f"₹{item.total_price():.2f}") for i, item in enumerate(self.app.cart)]
 
-        self.cart_tree = self._create_treeview(self.cart_tree_frame, columns, data, column_widths, headings)
+        self.cart_table = self._create_virtual_treeview(self.table_frame, columns, len(self.app.cart), self._cart_rows, column_widths, headings)
+        self.cart_tree = self.cart_table.tree
         self.cart_tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self._subscribe(self.app.cart, self._on_cart_change)
+        self._on_cart_change("clear", None)
+
+    def _cart_rows(self, start, stop):
+        return [(i+1, item.product.name, item.quantity, price_text(item.product.price_paise), format_money(item.total_paise())) for i, item in ((i, self.app.cart[i]) for i in range(start, stop))]
+
+    def _on_cart_change(self, event, index):
+        if event == "update":
+            self.cart_table.refresh_row(index)
+        else:
+            self.cart_table.refresh(len(self.app.cart))
+
+        if not self.app.cart:
+            self.table_frame.pack_forget()
+            self.empty_label.pack(pady=10)
+        else:
+            self.empty_label.pack_forget()
+            self.table_frame.pack(fill="both", expand=True)
 
     def _on_tree_select(self, event):
         selected_items = self.cart_tree.selection()
         if selected_items:
-            item_index = int(selected_items[0])
+            item_index = self.cart_table.row_index(selected_items[0])
             self.item_number_entry.delete(0, tk.END)
             self.item_number_entry.insert(0, str(item_index + 1))
             # Also populate current quantity for convenience
@@ -441,42 +1110,34 @@ class UpdateCartItemFrame(BaseFrame):
             messagebox.showerror("Invalid Item", "Invalid item number.")
             return
 
-        cart_item = self.app.cart[item_index]
-        product = cart_item.product
-        old_quantity = cart_item.quantity
-
-        if new_quantity < 0:
-            messagebox.showerror("Invalid Quantity", "Quantity cannot be negative.")
+        product = self.app.cart[item_index].product
+        try:
+            outcome = self.app.cart_service.update_quantity(item_index, new_quantity)
+        except CartError as e:
+            messagebox.showerror(e.title, str(e))
             return
 
-        if new_quantity == old_quantity:
+        if outcome == "unchanged":
             messagebox.showinfo("No Change", "Quantity is already the same.")
             return
-        elif new_quantity == 0:
-            # Remove item from cart
-            self.app.cart.pop(item_index)
-            product.stock += old_quantity
+        elif outcome == "removed":
             messagebox.showinfo("Success", f"'{product.name}' removed from cart.")
-        elif new_quantity > old_quantity:
-            # Increase quantity
-            quantity_to_add = new_quantity - old_quantity
-            if quantity_to_add > product.stock:
-                messagebox.showerror("Not Enough Stock", f"Error: Only {product.stock} more of '{product.name}' available. Cannot increase to {new_quantity}.")
-                return
-            cart_item.quantity = new_quantity
-            product.stock -= quantity_to_add
-            messagebox.showinfo("Success", f"Quantity of '{product.name}' updated to {new_quantity}.")
-        else: # new_quantity < old_quantity
-            # Decrease quantity
-            quantity_to_remove = old_quantity - new_quantity
-            cart_item.quantity = new_quantity
-            product.stock += quantity_to_remove
+        else:
             messagebox.showinfo("Success", f"Quantity of '{product.name}' updated to {new_quantity}.")
 
-        # Refresh the frame to reflect changes
-        self.app._show_frame(UpdateCartItemFrame)
+        # Observers have already refreshed the affected rows; just reset the inputs
+        self.on_show()
 
 # Main Execution
 if __name__ == "__main__":
-    app = OnlineCartApp()
-    app.mainloop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ADH Cart - Online Shopping System")
+    parser.add_argument("catalog", nargs="?", help="CSV, SQLite or .snap catalog; a SQLite file also persists stock and the cart")
+    parser.add_argument("--promotions", help="JSON file with discount rules and coupons")
+    parser.add_argument("--journal", help="directory for the crash-recovery event log")
+    parser.add_argument("--receipts", help="directory where a receipt file is written for every order")
+    parser.add_argument("--perf", action="store_true", help="collect performance metrics from startup (press F12 to view)")
+    args = parser.parse_args()
+    if args.perf:
+        METRICS.enabled = True
+    app = OnlineCartApp(args.catalog, args.promotions, args.journal, args.receipts)
+    app.mainloop()
@@ -0,0 +1,51 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cart_engine import Catalog, Product, ProductColumns
+
+
+def rows(count):
+    # IDs and names are built up front so only the product representation is measured
+    return [(f"P{i:07d}", f"Product {i}", 1000 + (i % 5000) * 25, i % 1000) for i in range(count)]
+
+
+def measure(label, build, count):
+    data = rows(count)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(data)
+    elapsed = time.perf_counter() - start
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed:>7.2f}s  {count / elapsed:>12,.0f} products/sec  {used / count:>7.1f} bytes/product")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product representation load time and memory")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    # String storage is shared with the input rows, so bytes/product covers the record itself
+    measure("Product() validated", lambda data: [Product(i, n, p / 100, s) for i, n, p, s in data], args.count)
+    measure("Product.from_trusted", lambda data: [Product.from_trusted(*row) for row in data], args.count)
+    measure("Catalog.extend(trusted)", lambda data: Catalog(Product.from_trusted(*row) for row in data), args.count)
+    measure("ProductColumns", lambda data: _columns(data), args.count)
+
+
+def _columns(data):
+    columns = ProductColumns()
+    for row in data:
+        columns.append(*row)
+    return columns
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cart_engine import Catalog, CartService, CartError, Product, StockReservations
+
+
+def run(threads, carts, lines, products, stock, lock_stripes):
+    catalog = Catalog((Product(f"P{i:06d}", f"Product {i}", 100.0, stock) for i in range(products)), lock_stripes=lock_stripes)
+    reservations = StockReservations(catalog)
+    initial_stock = sum(p.stock for p in catalog)
+
+    def shop(cart_number):
+        service = CartService(catalog, reservations=reservations)
+        failures = 0
+        for line in range(lines):
+            try:
+                service.add(f"P{(cart_number * 7 + line) % products:06d}", 1)
+            except CartError:
+                failures += 1
+        # Every third shopper walks away, which must hand their units back
+        if cart_number % 3 and service.cart:
+            return failures, sum(quantity for _, _, quantity, _ in service.checkout())
+        service.abandon()
+        return failures, 0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(shop, range(carts)))
+    elapsed = time.perf_counter() - start
+
+    failures = sum(f for f, _ in results)
+    sold = sum(s for _, s in results)
+    remaining = sum(p.stock for p in catalog)
+    assert all(p.stock >= 0 for p in catalog), "oversold"
+    assert initial_stock - remaining == sold, "stock leaked"
+    return carts * lines / elapsed, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent stock reservation throughput")
+    parser.add_argument("--carts", type=int, default=2_000)
+    parser.add_argument("--lines", type=int, default=20)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=1_000, help="initial units per product; lower it to force contention")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    for lock_stripes in (1, 64):
+        for threads in args.threads:
+            rate, failures = run(threads, args.carts, args.lines, args.products, args.stock, lock_stripes)
+            print(f"stripes={lock_stripes:<3} threads={threads:<3} {rate:>12,.0f} reservations/sec  rejected={failures}")
+
+
+if __name__ == "__main__":
+    main()
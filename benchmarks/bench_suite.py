@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cart_engine import Cart, CartService, Catalog, Product, format_money
+from receipt import iter_summary_lines
+
+DEFAULT_CATALOG_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_CART_SIZES = (1, 100, 1_000, 10_000)
+TREEVIEW_ROW_LIMIT = 100_000  # eager Treeview population is skipped above this
+LOOKUPS = 10_000
+
+# Bumped when the results file layout changes; `--compare` flags benchmarks whose best
+# run is slower than the baseline's best run by more than the threshold
+RESULTS_VERSION = 1
+
+
+def synthetic_catalog(size, seed):
+    rng = random.Random(seed)
+    categories = ("Audio", "Computers", "Accessories", "Storage", "Home")
+    return Catalog(Product.from_trusted(f"P{i:07d}", f"Product {i}", rng.randint(100, 5_000_000), rng.randint(10_000, 20_000), categories[i % len(categories)])
+                   for i in range(size))
+
+
+def synthetic_cart(catalog, lines, seed):
+    rng = random.Random(seed)
+    service = CartService(catalog, Cart())
+    for position in rng.sample(range(len(catalog)), lines):
+        service.add(catalog[position].id, rng.randint(1, 5))
+    return service
+
+
+def measure(func, repeat, number=1):
+    # Median and best of `repeat` runs, each timing `number` calls, in seconds per call
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "repeat": repeat, "number": number}
+
+
+def bench_catalog(size, repeat, seed, results):
+    start = time.perf_counter()
+    catalog = synthetic_catalog(size, seed)
+    elapsed = time.perf_counter() - start
+    results[f"catalog.build[{size}]"] = {"median_s": elapsed, "min_s": elapsed, "repeat": 1, "number": 1}
+
+    rng = random.Random(seed)
+    # Lowercase IDs take the re-normalizing path that typed-in IDs go through
+    ids = [catalog[rng.randrange(size)].id.lower() for _ in range(LOOKUPS)]
+
+    def lookups():
+        for product_id in ids:
+            catalog.get(product_id)
+    stats = measure(lookups, repeat)
+    stats.update(median_s=stats["median_s"] / LOOKUPS, min_s=stats["min_s"] / LOOKUPS, number=LOOKUPS)
+    results[f"catalog.get[{size}]"] = stats
+
+    # Sort indexes are built on first use; after that sorting and range filters are slices
+    for key in ("name", "price", "stock"):
+        start = time.perf_counter()
+        catalog.query(key)
+        elapsed = time.perf_counter() - start
+        results[f"catalog.sort_index_build.{key}[{size}]"] = {"median_s": elapsed, "min_s": elapsed, "repeat": 1, "number": 1}
+    results[f"catalog.query.sorted_desc[{size}]"] = measure(lambda: catalog.query("price", descending=True), repeat, number=100)
+    results[f"catalog.query.filtered[{size}]"] = measure(lambda: catalog.query("name", price_range=(100_000, 110_000), stock_range=(15_000, None)), repeat)
+    return catalog
+
+
+def bench_cart(catalog, lines, repeat, seed, results):
+    key = f"[{len(catalog)}x{lines}]"
+    rng = random.Random(seed)
+    positions = rng.sample(range(len(catalog)), lines)
+
+    def fill():
+        service = CartService(catalog, Cart())
+        for position in positions:
+            service.add(catalog[position].id, 1)
+        service.abandon()
+    stats = measure(fill, repeat)
+    results[f"cart.add{key}"] = dict(stats, median_s=stats["median_s"] / lines, min_s=stats["min_s"] / lines, number=lines)
+
+    service = synthetic_cart(catalog, lines, seed)
+    indexes = [rng.randrange(lines) for _ in range(min(lines, 1_000))]
+
+    def updates():
+        for index in indexes:
+            service.update_quantity(index, service.cart[index].quantity % 5 + 1)
+    stats = measure(updates, repeat)
+    results[f"cart.update_quantity{key}"] = dict(stats, median_s=stats["median_s"] / len(indexes), min_s=stats["min_s"] / len(indexes), number=len(indexes))
+
+    results[f"cart.total{key}"] = measure(service.total_paise, repeat, number=100)
+    results[f"cart.full_total{key}"] = measure(lambda: sum(item.total_paise() for item in service.cart), repeat)
+    results[f"receipt.summary_lines{key}"] = measure(lambda: sum(1 for _ in iter_summary_lines(service.cart)), repeat)
+
+    # Removing from the back keeps positions stable so every run removes the same lines
+    def removes():
+        for _ in range(min(lines, 1_000)):
+            service.remove(len(service.cart) - 1)
+    start = time.perf_counter()
+    removes()
+    removed = min(lines, 1_000)
+    elapsed = (time.perf_counter() - start) / removed
+    results[f"cart.remove{key}"] = {"median_s": elapsed, "min_s": elapsed, "repeat": 1, "number": removed}
+    service.abandon()
+
+
+def start_virtual_display():
+    # Returns the Xvfb process (or None if a display already exists); raises if neither is available
+    if os.environ.get("DISPLAY"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        raise RuntimeError("no DISPLAY and Xvfb is not installed")
+    display = ":99"
+    process = subprocess.Popen([xvfb, display, "-screen", "0", "1280x1024x24"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ["DISPLAY"] = display
+    return process
+
+
+def eager_treeview(tk, ttk, parent_frame, columns, data, column_widths, headings):
+    # The one-insert-per-row Treeview the app used before VirtualTreeview, kept as the baseline
+    tree = ttk.Treeview(parent_frame, columns=columns, show="headings")
+    for col, heading in zip(columns, headings):
+        tree.heading(col, text=heading["text"], anchor=heading["anchor"])
+        tree.column(col, width=column_widths.get(col, 100), anchor=heading["anchor"])
+    for row_data in data:
+        tree.insert("", tk.END, values=row_data)
+    vsb = ttk.Scrollbar(parent_frame, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=vsb.set)
+    vsb.pack(side="right", fill="y")
+    tree.pack(side="left", fill="both", expand=True)
+    return tree
+
+
+def bench_treeview(catalog, repeat, results):
+    import tkinter as tk
+    from tkinter import ttk
+    from Code import COLOR_BACKGROUND, VirtualTreeview
+    root = tk.Tk()
+    root.withdraw()
+    columns = ("ID", "Name", "Price", "Stock")
+    headings = [{"text": col, "anchor": tk.W} for col in columns]
+    widths = {"ID": 80, "Name": 250, "Price": 100, "Stock": 80}
+
+    def rows(start, stop):
+        return [(p.id, p.name, format_money(p.price_paise), p.stock) for p in (catalog[i] for i in range(start, stop))]
+    try:
+        size = len(catalog)
+        if size <= TREEVIEW_ROW_LIMIT:
+            data = rows(0, size)
+
+            def populate():
+                frame = tk.Frame(root, bg=COLOR_BACKGROUND)
+                eager_treeview(tk, ttk, frame, columns, data, widths, headings)
+                root.update_idletasks()
+                frame.destroy()
+            results[f"ui.create_treeview[{size}]"] = measure(populate, repeat)
+
+        def virtual():
+            frame = tk.Frame(root, bg=COLOR_BACKGROUND)
+            VirtualTreeview(frame, columns, size, rows, widths, headings)
+            root.update_idletasks()
+            frame.destroy()
+        results[f"ui.virtual_treeview[{size}]"] = measure(virtual, repeat)
+    finally:
+        root.destroy()
+
+
+def compare(results, baseline_path, threshold):
+    # Prints the change per benchmark and returns the names that regressed past the threshold
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\n{'benchmark':<45} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        # Best-of-N is far less noisy than the median on a shared machine
+        before, after = baseline[name]["min_s"], stats["min_s"]
+        change = (after - before) / before * 100 if before else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<45} {before * 1e6:>10.2f}us {after * 1e6:>10.2f}us {change:>+8.1f}%{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ADH Cart benchmark suite (catalog, cart and UI operations)")
+    parser.add_argument("--catalog-sizes", type=int, nargs="+", default=DEFAULT_CATALOG_SIZES)
+    parser.add_argument("--cart-sizes", type=int, nargs="+", default=DEFAULT_CART_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a previous --output file")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent (default 10)")
+    parser.add_argument("--skip-ui", action="store_true", help="skip the Treeview benchmarks")
+    args = parser.parse_args()
+
+    results = {}
+    skipped = {}
+    xvfb = None
+    if not args.skip_ui:
+        try:
+            xvfb = start_virtual_display()
+        except RuntimeError as e:
+            skipped["ui"] = str(e)
+            print(f"Skipping Treeview benchmarks: {e}")
+    try:
+        for size in args.catalog_sizes:
+            catalog = bench_catalog(size, args.repeat, args.seed, results)
+            for lines in args.cart_sizes:
+                if lines <= size:
+                    bench_cart(catalog, lines, args.repeat, args.seed, results)
+            if not args.skip_ui and "ui" not in skipped:
+                bench_treeview(catalog, args.repeat, results)
+            print(f"catalog {size:,}: done")
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    for name, stats in results.items():
+        print(f"{name:<45} {stats['median_s'] * 1e6:>12.2f}us  (min {stats['min_s'] * 1e6:.2f}us)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"version": RESULTS_VERSION, "timestamp": time.time(), "python": platform.python_version(), "platform": platform.platform(),
+                       "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")}, "skipped": skipped, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:g}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+
+class Client:
+    # One keep-alive HTTP/1.1 connection per simulated shopper
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.session = None
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, data=None):
+        body = json.dumps(data).encode("utf-8") if data is not None else b""
+        headers = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n"
+        if self.session:
+            headers += f"X-Session-Id: {self.session}\r\n"
+        self.writer.write((headers + "\r\n").encode("latin-1") + body)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def shopper(host, port, product_ids, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    client = Client(host, port)
+    await client.connect()
+
+    async def timed(method, path, data=None):
+        start = time.perf_counter()
+        status, payload = await client.request(method, path, data)
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors[status] = errors.get(status, 0) + 1
+        return status, payload
+
+    try:
+        while time.perf_counter() < deadline:
+            _, payload = await timed("POST", "/sessions")
+            client.session = payload["session"]
+            # A typical visit: browse, search, fill a cart, tweak it, then buy or walk away
+            await timed("GET", f"/products?offset={rng.randrange(len(product_ids))}&limit=20")
+            await timed("GET", f"/products/search?q=product+{rng.randrange(100)}&limit=10")
+            for _ in range(rng.randint(1, 8)):
+                await timed("POST", "/cart/items", {"product_id": rng.choice(product_ids), "quantity": rng.randint(1, 3)})
+            await timed("PUT", "/cart/items/1", {"quantity": rng.randint(1, 5)})
+            await timed("GET", "/cart")
+            if rng.random() < 0.7:
+                await timed("POST", "/checkout")
+                await timed("DELETE", "/sessions")
+            else:
+                await timed("DELETE", "/sessions")
+            client.session = None
+    finally:
+        await client.close()
+
+
+async def run(host, port, sessions, duration, seed):
+    probe = Client(host, port)
+    await probe.connect()
+    _, payload = await probe.request("GET", "/products?limit=500")
+    await probe.close()
+    product_ids = [p["id"] for p in payload["products"]]
+    if not product_ids:
+        raise SystemExit("The server has no products to shop for.")
+
+    latencies = []
+    errors = {}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(shopper(host, port, product_ids, deadline, latencies, errors, seed + i) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    print(f"{sessions} concurrent sessions, {len(latencies):,} requests in {elapsed:.1f}s: {len(latencies) / elapsed:,.0f} requests/sec")
+    print(f"latency p50 {statistics.median(ordered) * 1000:.2f}ms  p99 {ordered[int(len(ordered) * 0.99)] * 1000:.2f}ms  max {ordered[-1] * 1000:.2f}ms")
+    if errors:
+        print("error responses: " + ", ".join(f"{status}: {count:,}" for status, count in sorted(errors.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the ADH Cart server (start it with python server.py)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent shoppers, each on its own keep-alive connection")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.sessions, args.duration, args.seed))
+
+
+if __name__ == "__main__":
+    main()
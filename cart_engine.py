@@ -0,0 +1,934 @@
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+from perf import METRICS
+
+# Stock counters are guarded by a fixed pool of locks picked by hashing the product ID
+STOCK_LOCK_STRIPES = 64
+
+def to_paise(amount):
+    return round(amount * 100)
+
+
+def format_money(paise):
+    sign = "-" if paise < 0 else ""
+    rupees, paise = divmod(abs(paise), 100)
+    return f"{sign}₹{rupees}.{paise:02d}"
+
+
+# Models (Classes)
+class Product:
+    # Prices are stored as integer paise; price is kept as a rupee view for display code
+    __slots__ = ("id", "name", "price_paise", "stock", "category")
+
+    def __init__(self, id, name, price, stock, category=""):
+        if not isinstance(id, str) or not isinstance(name, str) or not isinstance(category, str):
+            raise TypeError("Product ID, name and category must be strings.")
+        if not isinstance(price, (int, float)) or price <= 0:
+            raise ValueError("Product price must be a positive number.")
+        if not isinstance(stock, int) or stock < 0:
+            raise ValueError("Product stock must be a non-negative integer.")
+        self.id = id.strip().upper()
+        self.name = name.strip()
+        self.price_paise = to_paise(price)
+        self.stock = stock
+        self.category = category.strip()
+
+    @property
+    def price(self):
+        return self.price_paise / 100
+
+    @classmethod
+    def from_trusted(cls, id, name, price_paise, stock, category=""):
+        # Bulk-load path for already validated and normalized data (snapshots, our own exports)
+        product = cls.__new__(cls)
+        product.id = id
+        product.name = name
+        product.price_paise = price_paise
+        product.stock = stock
+        product.category = category
+        return product
+
+class CartItem:
+    __slots__ = ("product", "quantity", "pricing")
+
+    def __init__(self, product: Product, quantity: int, pricing=None):
+        if not isinstance(product, Product):
+            raise TypeError("CartItem product must be an instance of Product.")
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise ValueError("CartItem quantity must be a positive integer.")
+        self.product = product
+        self.quantity = quantity
+        self.pricing = pricing
+
+    def base_total_paise(self):
+        return self.product.price_paise * self.quantity
+
+    def total_paise(self):
+        # Line total after promotions when the cart has a pricing engine attached
+        if self.pricing is None:
+            return self.product.price_paise * self.quantity
+        return self.pricing.line_total_paise(self.product, self.quantity)
+
+    def total_price(self):
+        return self.total_paise() / 100
+
+class ProductColumns:
+    # Columnar product store: parallel arrays of IDs, names, prices in paise and stock.
+    # Uses about half the memory of Product objects; rows are materialized on demand.
+    def __init__(self):
+        self.ids = []
+        self.names = []
+        self.price_paise = array("q")
+        self.stock = array("q")
+        self.categories = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, id, name, price_paise, stock, category=""):
+        self.ids.append(id)
+        self.names.append(name)
+        self.price_paise.append(price_paise)
+        self.stock.append(stock)
+        self.categories.append(category)
+
+    @classmethod
+    def from_products(cls, products):
+        columns = cls()
+        for p in products:
+            columns.append(p.id, p.name, p.price_paise, p.stock, p.category)
+        return columns
+
+    def product(self, index):
+        return Product.from_trusted(self.ids[index], self.names[index], self.price_paise[index], self.stock[index], self.categories[index])
+
+    def products(self):
+        return map(self.product, range(len(self.ids)))
+
+class Observable:
+    # Minimal observer hook: callbacks receive (event, index) after each change.
+    # Inside batch(), regular observers get a single "reset" at the end; observers
+    # subscribed with every_event=True (persistence, logging) still see each change.
+    def __init__(self):
+        self._observers = []
+        self._raw_observers = []
+        self._batch_depth = 0
+        self._batch_changed = False
+
+    def subscribe(self, callback, every_event=False):
+        (self._raw_observers if every_event else self._observers).append(callback)
+
+    def unsubscribe(self, callback):
+        for observers in (self._observers, self._raw_observers):
+            if callback in observers:
+                observers.remove(callback)
+
+    @contextmanager
+    def batch(self):
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batch_changed:
+                self._batch_changed = False
+                for callback in list(self._observers):
+                    callback("reset", None)
+
+    def _notify(self, event, index=None):
+        for callback in list(self._raw_observers):
+            callback(event, index)
+        if self._batch_depth:
+            self._batch_changed = True
+            return
+        for callback in list(self._observers):
+            callback(event, index)
+
+
+class StockIndex:
+    # Positions sorted by (stock, position), split into chunks of up to 2 * CHUNK_SIZE entries
+    # so moving one product after a stock change costs O(sqrt n) rather than shifting a
+    # million-entry list. Entries are packed as stock << 32 | position. Reads by rank go
+    # through cumulative chunk offsets, rebuilt lazily after a move.
+    CHUNK_SIZE = 1000
+
+    def __init__(self, positions, stocks):
+        entries = [stocks[p] << 32 | p for p in positions]
+        self._chunks = [entries[i:i + self.CHUNK_SIZE] for i in range(0, len(entries), self.CHUNK_SIZE)] or [[]]
+        self._maxes = [chunk[-1] if chunk else 0 for chunk in self._chunks]
+        self._offsets = None
+        self._length = len(entries)
+
+    def __len__(self):
+        return self._length
+
+    def _chunk_offsets(self):
+        if self._offsets is None:
+            offsets, total = [], 0
+            for chunk in self._chunks:
+                offsets.append(total)
+                total += len(chunk)
+            self._offsets = offsets
+        return self._offsets
+
+    def _locate(self, rank):
+        offsets = self._chunk_offsets()
+        chunk = bisect_right(offsets, rank) - 1
+        return chunk, rank - offsets[chunk]
+
+    def __getitem__(self, rank):
+        if isinstance(rank, slice):
+            start, stop, _ = rank.indices(self._length)
+            result = []
+            if start < stop:
+                chunk, offset = self._locate(start)
+                while len(result) < stop - start:
+                    result.extend(entry & 0xFFFFFFFF for entry in self._chunks[chunk][offset:offset + stop - start - len(result)])
+                    chunk, offset = chunk + 1, 0
+            return result
+        if not 0 <= rank < self._length:
+            raise IndexError("stock index out of range")
+        chunk, offset = self._locate(rank)
+        return self._chunks[chunk][offset] & 0xFFFFFFFF
+
+    def _rank_of(self, entry, right=False):
+        chunk = (bisect_right if right else bisect_left)(self._maxes, entry)
+        if chunk == len(self._chunks):
+            return self._length
+        offset = (bisect_right if right else bisect_left)(self._chunks[chunk], entry)
+        return self._chunk_offsets()[chunk] + offset
+
+    def bisect_left(self, stock):
+        return 0 if stock is None else self._rank_of(max(stock, 0) << 32)
+
+    def bisect_right(self, stock):
+        return self._length if stock is None else self._rank_of((stock + 1) << 32) if stock >= 0 else 0
+
+    def move(self, position, old_stock, new_stock):
+        old, new = old_stock << 32 | position, new_stock << 32 | position
+        chunk = bisect_left(self._maxes, old)
+        entries = self._chunks[chunk]
+        del entries[bisect_left(entries, old)]
+        if entries:
+            self._maxes[chunk] = entries[-1]
+        elif len(self._chunks) > 1:
+            del self._chunks[chunk]
+            del self._maxes[chunk]
+
+        chunk = min(bisect_left(self._maxes, new), len(self._chunks) - 1)
+        entries = self._chunks[chunk]
+        insort(entries, new)
+        self._maxes[chunk] = entries[-1]
+        if len(entries) > 2 * self.CHUNK_SIZE:
+            self._chunks[chunk:chunk + 1] = [entries[:self.CHUNK_SIZE], entries[self.CHUNK_SIZE:]]
+            self._maxes[chunk:chunk + 1] = [entries[self.CHUNK_SIZE - 1], entries[-1]]
+        self._offsets = None
+
+
+class ReversedPositions:
+    # Descending view over an ascending position sequence, without copying it
+    def __init__(self, positions):
+        self._positions = positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self._positions)
+        if not 0 <= i < len(self._positions):
+            raise IndexError("position index out of range")
+        return self._positions[len(self._positions) - 1 - i]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class Catalog(Observable):
+    # Product store with an O(1) ID index plus lazily built, sorted name/price/stock indexes.
+    # The name and price indexes never change with stock; the stock index, once built, is
+    # patched in place on every stock change instead of being rebuilt.
+    SORT_KEYS = ("position", "name", "price", "stock")
+
+    def __init__(self, products=(), lock_stripes=STOCK_LOCK_STRIPES):
+        super().__init__()
+        self._products = []
+        self._positions = {}
+        self._stock_locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._name_index = None
+        self._price_index = None
+        self._search_index = None
+        self._index_generation = 0
+        self._stock_index = None
+        self._stock_index_lock = threading.Lock()
+        self.extend(products)
+
+    def __len__(self):
+        return len(self._products)
+
+    def __iter__(self):
+        return iter(self._products)
+
+    def __getitem__(self, position):
+        return self._products[position]
+
+    def add(self, product):
+        if not isinstance(product, Product):
+            raise TypeError("Catalog entries must be instances of Product.")
+        if product.id in self._positions:
+            raise ValueError(f"Duplicate product ID '{product.id}'.")
+        self._positions[product.id] = len(self._products)
+        self._products.append(product)
+        self._invalidate_indexes()
+        self._notify("add", len(self._products) - 1)
+
+    def extend(self, products):
+        # Batched add: one index invalidation and one "reset" event for the whole batch
+        positions = self._positions
+        start = len(self._products)
+        for product in products:
+            if not isinstance(product, Product):
+                raise TypeError("Catalog entries must be instances of Product.")
+            if product.id in positions:
+                raise ValueError(f"Duplicate product ID '{product.id}'.")
+            positions[product.id] = len(self._products)
+            self._products.append(product)
+        if len(self._products) != start:
+            self._invalidate_indexes()
+            self._notify("reset")
+
+    def _invalidate_indexes(self):
+        self._name_index = self._price_index = self._search_index = self._stock_index = None
+        self._index_generation += 1
+
+    def position_of(self, product_id):
+        # Stored IDs are already normalized, so only re-normalize on a miss
+        position = self._positions.get(product_id)
+        if position is None:
+            position = self._positions.get(product_id.strip().upper())
+        return position
+
+    def get(self, product_id):
+        position = self.position_of(product_id)
+        return None if position is None else self[position]
+
+    def stock_lock(self, product_id):
+        return self._stock_locks[hash(product_id) % len(self._stock_locks)]
+
+    def adjust_stock(self, product, delta):
+        position = self.position_of(product.id)
+        with self.stock_lock(product.id):
+            if product.stock + delta < 0:
+                raise ValueError(f"Stock of '{product.name}' cannot go below zero.")
+            product.stock += delta
+            if self._stock_index is not None:
+                self._reindex_stock(position, product.stock - delta, product.stock)
+        self._notify("stock", position)
+
+    def take_stock(self, product, quantity):
+        # Atomic check-and-decrement; returns False instead of overselling
+        position = self.position_of(product.id)
+        with self.stock_lock(product.id):
+            if quantity > product.stock:
+                return False
+            product.stock -= quantity
+            if self._stock_index is not None:
+                self._reindex_stock(position, product.stock + quantity, product.stock)
+        self._notify("stock", position)
+        return True
+
+    # Raw column access for index builds; storage-backed catalogs override these
+    def _ids(self):
+        return (p.id for p in self._products)
+
+    def _names(self):
+        return (p.name for p in self._products)
+
+    def _prices(self):
+        return (p.price_paise for p in self._products)
+
+    def _stocks(self):
+        return (p.stock for p in self._products)
+
+    def _price_at(self, position):
+        return self[position].price_paise
+
+    def _stock_at(self, position):
+        return self[position].stock
+
+    def _build_name_index(self):
+        # Sorting positions by key is stable, so equal keys stay in position order
+        names = [name.lower() for name in self._names()]
+        positions = sorted(range(len(names)), key=names.__getitem__)
+        self._name_index = ([names[i] for i in positions], positions)
+
+    def _build_price_index(self):
+        prices = list(self._prices())
+        positions = sorted(range(len(prices)), key=prices.__getitem__)
+        self._price_index = ([prices[i] for i in positions], positions)
+
+    def _build_stock_index(self):
+        # Every stripe lock is held so no stock changes while the index is being built
+        with ExitStack() as stack:
+            for lock in self._stock_locks:
+                stack.enter_context(lock)
+            if self._stock_index is None:
+                stocks = list(self._stocks())
+                self._stock_index = StockIndex(sorted(range(len(stocks)), key=stocks.__getitem__), stocks)
+
+    def _reindex_stock(self, position, old_stock, new_stock):
+        # Called with the product's stripe lock held; other stripes may move entries concurrently
+        with self._stock_index_lock:
+            self._stock_index.move(position, old_stock, new_stock)
+
+    def _sorted_index(self, key):
+        # (keys, positions) for a sort key, or None for insertion order
+        if key == "name":
+            if self._name_index is None:
+                self._build_name_index()
+            return self._name_index
+        if key == "price":
+            if self._price_index is None:
+                self._build_price_index()
+            return self._price_index
+        if key == "stock":
+            if self._stock_index is None:
+                self._build_stock_index()
+            return self._stock_index, self._stock_index
+        if key != "position":
+            raise ValueError(f"Unknown sort key '{key}'.")
+        return None
+
+    def _range_slice(self, column, bounds):
+        # (start, stop) of the inclusive bounds within the column's sorted index
+        index = self._sorted_index(column)
+        low, high = bounds
+        if column == "stock":
+            return index[0].bisect_left(low), index[0].bisect_right(high)
+        keys = index[0]
+        return (0 if low is None else bisect_left(keys, low)), (len(keys) if high is None else bisect_right(keys, high))
+
+    def _sort_key(self, sort):
+        if sort == "name":
+            return lambda p: (self[p].name.lower(), p)
+        if sort == "price":
+            return lambda p: (self._price_at(p), p)
+        if sort == "stock":
+            return lambda p: (self._stock_at(p), p)
+        return None
+
+    def query(self, sort="position", descending=False, price_range=None, stock_range=None):
+        # Positions of products within the inclusive (low, high) price (in paise) and stock
+        # ranges, in sort order; None leaves a bound open. Without filters this is the sort
+        # column's live index (read-only). With filters, candidates come from whichever
+        # filter's index slice is smallest, so cost follows the result size, not the catalog.
+        self._sorted_index(sort)
+        filters = {column: bounds for column, bounds in (("price", price_range), ("stock", stock_range)) if bounds is not None}
+        if not filters:
+            index = self._sorted_index(sort)
+            positions = range(len(self)) if index is None else index[1]
+        else:
+            slices = {column: self._range_slice(column, bounds) for column, bounds in filters.items()}
+            narrowest = min(slices, key=lambda column: (slices[column][1] - slices[column][0], column != sort))
+            start, stop = slices[narrowest]
+            positions = self._sorted_index(narrowest)[1][start:stop]
+            for column, (low, high) in filters.items():
+                if column != narrowest:
+                    value_at = self._price_at if column == "price" else self._stock_at
+                    low = float("-inf") if low is None else low
+                    high = float("inf") if high is None else high
+                    positions = [p for p in positions if low <= value_at(p) <= high]
+            if narrowest != sort:
+                positions = sorted(positions, key=self._sort_key(sort))
+        return ReversedPositions(positions) if descending else positions
+
+    def _build_search_index(self):
+        # Sorted IDs plus one sorted entry per distinct word of each name, for word-prefix lookups.
+        # Safe on a worker thread: the index is published only if the catalog did not change meanwhile.
+        generation = self._index_generation
+        ids =sorted((product_id, i) for i, product_id in enumerate(self._ids()))
+        words = sorted((word, i) for i, name in enumerate(self._names()) for word in set(name.lower().split()))
+        index = (([key for key, _ in ids], [i for _, i in ids]),
+                 ([key for key, _ in words], [i for _, i in words]))
+        if generation == self._index_generation:
+            self._search_index = index
+        return index
+
+    @property
+    def search_ready(self):
+        return self._search_index is not None
+
+    def prepare_search(self):
+        if self._search_index is None:
+            self._build_search_index()
+
+    def search(self, query, limit=20):
+        # Top-k products whose ID starts with the query, then those with a name word matching
+        # every query word by prefix. Each range lookup is a bisect, so cost is O(log n + k).
+        words = query.strip().lower().split()
+        if not words:
+            return []
+        index = self._search_index
+        if index is None:
+            index = self._build_search_index()
+        (id_keys, id_positions), (word_keys, word_positions) = index
+        results = []
+        seen = set()
+
+        id_prefix = query.strip().upper()
+        for i in range(bisect_left(id_keys, id_prefix), len(id_keys)):
+            if len(results) >= limit or not id_keys[i].startswith(id_prefix):
+                break
+            seen.add(id_positions[i])
+            results.append(self[id_positions[i]])
+
+        # Walk the narrowest word range and check the remaining words against each name
+        ranges = {word: (bisect_left(word_keys, word), bisect_left(word_keys, word + "\uffff")) for word in words}
+        anchor = min(ranges, key=lambda word: ranges[word][1] - ranges[word][0])
+        others = [word for word in ranges if word != anchor]
+        for i in range(*ranges[anchor]):
+            if len(results) >= limit:
+                break
+            position = word_positions[i]
+            if position in seen:
+                continue
+            product = self[position]
+            if others:
+                name_words = product.name.lower().split()
+                if not all(any(name_word.startswith(word) for name_word in name_words) for word in others):
+                    continue
+            seen.add(position)
+            results.append(product)
+        return results
+
+
+class Cart(Observable):
+    # Ordered cart lines with a product ID -> line index map for O(1) lookups.
+    # The subtotal (in paise) and unit count are kept up to date on every change;
+    # with a pricing engine, line totals include promotions and total_paise the coupon.
+    def __init__(self, pricing=None):
+        super().__init__()
+        self._items = []
+        self._positions = {}
+        self.subtotal_paise = 0
+        self.item_count = 0
+        self.coupon = None
+        self.pricing = pricing
+        if pricing is not None:
+            pricing.subscribe(self._on_pricing_change)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    @property
+    def discount_paise(self):
+        if self.coupon is None or self.pricing is None:
+            return 0
+        return self.pricing.coupon_discount_paise(self.coupon, self.subtotal_paise)
+
+    @property
+    def total_paise(self):
+        return self.subtotal_paise - self.discount_paise
+
+    def find(self, product_id):
+        index = self._positions.get(product_id)
+        return None if index is None else self._items[index]
+
+    def position_of(self, product_id):
+        return self._positions.get(product_id)
+
+    def add(self, product, quantity):
+        index = self._positions.get(product.id)
+        self.item_count += quantity
+        if index is not None:
+            item = self._items[index]
+            self.subtotal_paise -= item.total_paise()
+            item.quantity += quantity
+            self.subtotal_paise += item.total_paise()
+            self._notify("update", index)
+        else:
+            item = CartItem(product, quantity, self.pricing)
+            self.subtotal_paise += item.total_paise()
+            self._positions[product.id] = len(self._items)
+            self._items.append(item)
+            self._notify("add", len(self._items) - 1)
+
+    def set_quantity(self, index, quantity):
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise ValueError("CartItem quantity must be a positive integer.")
+        item = self._items[index]
+        self.subtotal_paise -= item.total_paise()
+        self.item_count += quantity - item.quantity
+        item.quantity = quantity
+        self.subtotal_paise += item.total_paise()
+        self._notify("update", index)
+
+    def remove(self, index):
+        item = self._items.pop(index)
+        del self._positions[item.product.id]
+        self.subtotal_paise -= item.total_paise()
+        self.item_count -= item.quantity
+        for i in range(index, len(self._items)):
+            self._positions[self._items[i].product.id] = i
+        self._notify("remove", index)
+        return item
+
+    def set_coupon(self, code):
+        self.coupon = code
+        self._notify("reset")
+
+    def reprice(self):
+        self.subtotal_paise = sum(item.total_paise() for item in self._items)
+        self._notify("reset")
+
+    def _on_pricing_change(self, event, index):
+        self.reprice()
+
+    def close(self):
+        # Detaches from a shared pricing engine so discarded carts are not kept alive or repriced
+        if self.pricing is not None:
+            self.pricing.unsubscribe(self._on_pricing_change)
+
+    def clear(self):
+        self._items = []
+        self._positions = {}
+        self.subtotal_paise = 0
+        self.item_count = 0
+        self.coupon = None
+        self._notify("clear")
+
+
+class StockReservations:
+    # Tracks how much stock each holder (normally a Cart) has taken out of the catalog.
+    # With a ttl, holders idle for longer than ttl seconds are released by expire().
+    def __init__(self, catalog, ttl=None, clock=time.monotonic):
+        self.catalog = catalog
+        self.ttl = ttl
+        self._clock = clock
+        self._holds = {}
+        self._deadlines = {}
+
+    def held(self, holder, product_id):
+        return self._holds.get(holder, {}).get(product_id, 0)
+
+    def touch(self, holder):
+        if self.ttl is not None:
+            self._deadlines[holder] = self._clock() + self.ttl
+
+    def reserve(self, holder, product, quantity):
+        if not self.catalog.take_stock(product, quantity):
+            return False
+        holds = self._holds.setdefault(holder, {})
+        with self.catalog.stock_lock(product.id):
+            holds[product.id] = holds.get(product.id, 0) + quantity
+        self.touch(holder)
+        return True
+
+    def restore(self, holder, product, quantity):
+        # Re-registers a hold whose stock was already taken in an earlier session
+        holds = self._holds.setdefault(holder, {})
+        with self.catalog.stock_lock(product.id):
+            holds[product.id] = holds.get(product.id, 0) + quantity
+        self.touch(holder)
+
+    def release(self, holder, product, quantity):
+        holds = self._holds.get(holder, {})
+        with self.catalog.stock_lock(product.id):
+            quantity = min(quantity, holds.get(product.id, 0))
+            remaining = holds.get(product.id, 0) - quantity
+            if remaining:
+                holds[product.id] = remaining
+            else:
+                holds.pop(product.id, None)
+        if quantity:
+            self.catalog.adjust_stock(product, quantity)
+        self.touch(holder)
+        return quantity
+
+    def release_all(self, holder):
+        holds = self._holds.pop(holder, {})
+        self._deadlines.pop(holder, None)
+        for product_id, quantity in list(holds.items()):
+            self.catalog.adjust_stock(self.catalog.get(product_id), quantity)
+
+    def commit(self, holder, lines=None):
+        # The held stock is sold: forget the holds without returning anything to the catalog.
+        # With (product, quantity) lines only those units are sold and any other holds stay.
+        if lines is None:
+            self._holds.pop(holder, None)
+            self._deadlines.pop(holder, None)
+            return
+        holds = self._holds.get(holder, {})
+        for product, quantity in lines:
+            with self.catalog.stock_lock(product.id):
+                remaining = holds.get(product.id, 0) - quantity
+                if remaining > 0:
+                    holds[product.id] = remaining
+                else:
+                    holds.pop(product.id, None)
+
+    def forget(self, holder):
+        # Drops the holds without touching stock, when stock levels are being rebuilt from elsewhere
+        self._holds.pop(holder, None)
+        self._deadlines.pop(holder, None)
+
+    def expire(self, now=None):
+        # Releases every holder whose deadline has passed and returns them so callers can empty those carts
+        now = self._clock() if now is None else now
+        expired = [holder for holder, deadline in list(self._deadlines.items()) if deadline <= now]
+        for holder in expired:
+            self.release_all(holder)
+        return expired
+
+
+# Engine
+# Column names accepted in an optional first header row of pasted orders
+ORDER_HEADER_FIELDS = (("id", "product_id", "product"), ("quantity", "qty"))
+
+
+def parse_order_text(text):
+    # Parses pasted orders, one "PRODUCT_ID quantity" per line (comma, tab or space separated).
+    # Blank lines, "#" comments and an "id,quantity" header are skipped.
+    # Returns ([(line_number, product_id, quantity)], [(line_number, message)]).
+    lines = []
+    errors = []
+    for line_number, raw in enumerate(text.splitlines(), start=1):
+        line = raw.split("#", 1)[0].strip()
+        if not line:
+            continue
+        fields = line.replace(",", " ").replace("\t", " ").split()
+        if len(fields) != 2:
+            errors.append((line_number, f"Expected 'PRODUCT_ID QUANTITY', got '{raw.strip()}'."))
+            continue
+        product_id, quantity = fields
+        if not lines and not errors and product_id.lower() in ORDER_HEADER_FIELDS[0] and quantity.lower() in ORDER_HEADER_FIELDS[1]:
+            continue
+        try:
+            quantity = int(quantity)
+        except ValueError:
+            errors.append((line_number, f"Quantity '{quantity}' is not a whole number."))
+            continue
+        lines.append((line_number, product_id.upper(), quantity))
+    return lines, errors
+
+
+class CartError(Exception):
+    title = "Error"
+
+
+class ProductNotFoundError(CartError):
+    pass
+
+
+class OutOfStockError(CartError):
+    title = "Out of Stock"
+
+
+class InsufficientStockError(CartError):
+    title = "Not Enough Stock"
+
+
+class InvalidItemError(CartError):
+    title = "Invalid Item"
+
+
+class InvalidQuantityError(CartError):
+    title = "Invalid Quantity"
+
+
+class CheckoutInProgressError(CartError):
+    title = "Checkout in Progress"
+
+
+class InvalidCouponError(CartError):
+    title = "Invalid Coupon"
+
+
+class CartService:
+    # Headless cart operations; the GUI (or any other front end) only translates input and errors
+    def __init__(self, catalog, cart=None, reservations=None, journal=None):
+        self.catalog = catalog
+        self.cart = cart if cart is not None else Cart()
+        self.reservations = reservations if reservations is not None else StockReservations(catalog)
+        self.journal = journal
+        # Set by CheckoutPipeline while an order is being placed; the cart is read-only until it finishes
+        self.checkout_pending = False
+
+    def _check_editable(self):
+        if self.checkout_pending:
+            raise CheckoutInProgressError("Your order is being placed; the cart cannot be changed until checkout finishes.")
+
+    def _record_line(self, op, product):
+        # Journal events carry the resulting cart quantity and stock, not deltas
+        if self.journal is not None:
+            item = self.cart.find(product.id)
+            self.journal.record({"op": op, "id": product.id, "qty": item.quantity if item else 0, "stock": product.stock})
+
+    def _item_at(self, index):
+        if not isinstance(index, int) or not (0 <= index < len(self.cart)):
+            raise InvalidItemError("Invalid item number.")
+        return self.cart[index]
+
+    @METRICS.timed("cart.add")
+    def add(self, product_id, quantity):
+        self._check_editable()
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise InvalidQuantityError("Quantity must be a positive whole number.")
+        # Catalog.get itself stays unwrapped for search and recovery; lookups made for the cart are timed here
+        with METRICS.timer("catalog.get"):
+            product = self.catalog.get(product_id)
+        if product is None:
+            raise ProductNotFoundError(f"Product with ID '{product_id.strip().upper()}' not found.")
+        if product.stock == 0:
+            raise OutOfStockError(f"Sorry, '{product.name}' is out of stock.")
+        if not self.reservations.reserve(self.cart, product, quantity):
+            existing_item = self.cart.find(product.id)
+            in_cart = existing_item.quantity if existing_item else 0
+            raise InsufficientStockError(f"Error: Only {product.stock} of '{product.name}' available (already {in_cart} in cart).")
+
+        self.cart.add(product, quantity)
+        self._record_line("add", product)
+        return self.cart.find(product.id)
+
+    @METRICS.timed("cart.update_quantity")
+    def update_quantity(self, index, new_quantity):
+        # Returns "unchanged", "removed" or "updated"
+        self._check_editable()
+        item = self._item_at(index)
+        product = item.product
+        old_quantity = item.quantity
+
+        if not isinstance(new_quantity, int) or new_quantity < 0:
+            raise InvalidQuantityError("Quantity cannot be negative.")
+        if new_quantity == old_quantity:
+            return "unchanged"
+        if new_quantity == 0:
+            self.remove(index)
+            return "removed"
+        if new_quantity > old_quantity:
+            if not self.reservations.reserve(self.cart, product, new_quantity - old_quantity):
+                raise InsufficientStockError(f"Error: Only {product.stock} more of '{product.name}' available. Cannot increase to {new_quantity}.")
+            self.cart.set_quantity(index, new_quantity)
+        else:
+            self.cart.set_quantity(index, new_quantity)
+            self.reservations.release(self.cart, product, old_quantity - new_quantity)
+        self._record_line("update", product)
+        return "updated"
+
+    @METRICS.timed("cart.add_many")
+    def add_many(self, lines):
+        # Bulk add of (product_id, quantity) pairs in one pass. Observers see a single
+        # "reset" at the end; returns (units_added, [(line_index, product_id, message), ...]).
+        self._check_editable()
+        added = 0
+        failures = []
+        with self.catalog.batch(), self.cart.batch():
+            for line_index, (product_id, quantity) in enumerate(lines):
+                try:
+                    self.add(product_id, quantity)
+                except CartError as e:
+                    failures.append((line_index, product_id, str(e)))
+                else:
+                    added += quantity
+        return added, failures
+
+    def restore(self, lines):
+        # Puts persisted (product, quantity) lines back in the cart without taking stock again
+        for product, quantity in lines:
+            self.reservations.restore(self.cart, product, quantity)
+            self.cart.add(product, quantity)
+
+    @METRICS.timed("cart.remove")
+    def remove(self, index):
+        self._check_editable()
+        self._item_at(index)
+        item = self.cart.remove(index)
+        self.reservations.release(self.cart, item.product, item.quantity)
+        self._record_line("remove", item.product)
+        return item
+
+    def total_paise(self):
+        return self.cart.total_paise
+
+    def apply_coupon(self, code):
+        self._check_editable()
+        code = code.strip().upper()
+        pricing = self.cart.pricing
+        if not code:
+            self.cart.set_coupon(None)
+            if self.journal is not None:
+                self.journal.record({"op": "coupon", "code": None})
+            return
+        if pricing is None or not pricing.has_coupon(code):
+            raise InvalidCouponError(f"Coupon '{code}' is not valid.")
+        self.cart.set_coupon(code)
+        if self.journal is not None:
+            self.journal.record({"op": "coupon", "code": code})
+
+    def total(self):
+        return self.cart.total_paise / 100
+
+    def checkout(self):
+        # Stock was reserved when items were added, so placing the order just commits the holds
+        self._check_editable()
+        if not self.cart:
+            raise CartError("Your cart is empty. Nothing to checkout.")
+        order = [(item.product.id, item.product.name, item.quantity, item.total_paise()) for item in self.cart]
+        self.reservations.commit(self.cart)
+        self.finish_checkout()
+        return order
+
+    def finish_checkout(self, order_id=None, lines=None):
+        # Called once the order is placed (directly or by CheckoutPipeline.finish). With
+        # (product, quantity) lines only the ordered units leave the cart.
+        if lines is None:
+            self.cart.clear()
+        else:
+            with self.cart.batch():
+                for product, quantity in lines:
+                    index = self.cart.position_of(product.id)
+                    if index is None:
+                        continue
+                    if self.cart[index].quantity > quantity:
+                        self.cart.set_quantity(index, self.cart[index].quantity - quantity)
+                    else:
+                        self.cart.remove(index)
+                self.cart.set_coupon(None)
+        self.checkout_pending = False
+        if self.journal is not None:
+            self.journal.record({"op": "checkout", "order": order_id, "cart": {item.product.id: item.quantity for item in self.cart}})
+            self.journal.sync()
+
+    def abandon(self):
+        # Cancelled checkout or abandoned session: put every reserved unit back on the shelf
+        self._check_editable()
+        products = [item.product for item in self.cart]
+        self.reservations.release_all(self.cart)
+        self.cart.clear()
+        if self.journal is not None:
+            self.journal.record({"op": "abandon", "stock": {p.id: p.stock for p in products}})
+
+    def recover(self, state):
+        # Rebuilds stock levels and the cart from an EventLog state after a restart. The log
+        # holds absolute values, so whatever was restored before (e.g. a SQLite cart) is replaced.
+        for product_id, stock in state["stock"].items():
+            product = self.catalog.get(product_id)
+            if product is not None and product.stock != stock:
+                self.catalog.adjust_stock(product, stock - product.stock)
+        self.reservations.forget(self.cart)
+        self.cart.clear()
+        self.restore((product, quantity) for product, quantity in ((self.catalog.get(pid), q) for pid, q in state["cart"].items()) if product is not None)
+        if state["coupon"]:
+            self.cart.set_coupon(state["coupon"])
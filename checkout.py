@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+import time
+import uuid
+
+from cart_engine import CartError, CheckoutInProgressError
+from perf import METRICS
+from receipt import iter_receipt_lines, write_receipt
+
+
+class CheckoutCancelled(Exception):
+    pass
+
+
+class CheckoutPipeline:
+    # Runs checkout as stages on a worker thread. The caller polls `events` for
+    # ("progress", fraction, stage), ("done", receipt_path), ("cancelled", None) or ("failed", message)
+    # and calls finish() on its own thread once "done" arrives. With a receipt_dir the receipt
+    # is streamed to a file there; receipt_lines() regenerates it lazily either way. A failure
+    # before the order is saved puts the stock holds back; once it is saved the order stands,
+    # and a receipt that cannot be written is reported in receipt_error alongside "done".
+    STAGES = ("Validating cart", "Committing stock", "Saving order", "Generating receipt")
+
+    def __init__(self, service, order_sink=None, receipt_dir=None, progress_every=500):
+        self.service = service
+        self.order_sink = order_sink
+        self.progress_every = progress_every
+        self.events = queue.Queue()
+        self.order_id = uuid.uuid4().hex[:12].upper()
+        self.receipt_path = os.path.join(receipt_dir, f"receipt-{self.order_id}.txt") if receipt_dir else None
+        self.placed_at = None
+        self._cancel = threading.Event()
+        self._committed = False
+        self._saved = False
+        self.receipt_error = None
+        self._thread = None
+
+    def start(self):
+        if not self.service.cart:
+            raise CartError("Your cart is empty. Nothing to checkout.")
+        if self.service.checkout_pending:
+            raise CheckoutInProgressError("An order is already being placed.")
+        # Snapshot on the caller's thread so the worker never reads a cart that is being edited
+        self.lines = [(item.product, item.quantity, item.total_paise()) for item in self.service.cart]
+        self.total_paise = self.service.cart.total_paise
+        self.coupon = self.service.cart.coupon
+        self.discount_paise = self.service.cart.discount_paise
+        self.placed_at = time.time()
+        # Cart edits are refused until finish() (or a cancel/failure), so the worker reads a stable cart
+        self.service.checkout_pending = True
+        self._thread = threading.Thread(target=self._run, name=f"checkout-{self.order_id}", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        # Only honoured before stock is committed; after that the order goes through
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _ordered(self):
+        return [(product, quantity) for product, quantity, _ in self.lines]
+
+    def finish(self):
+        self.service.finish_checkout(self.order_id, self._ordered())
+
+    def _progress(self, stage_index, done, total):
+        if done % self.progress_every == 0 or done == total:
+            if not self._committed and self._cancel.is_set():
+                raise CheckoutCancelled()
+            fraction = (stage_index + (done / total if total else 1)) / len(self.STAGES)
+            self.events.put(("progress", fraction, self.STAGES[stage_index]))
+
+    def _run(self):
+        try:
+            with METRICS.timer("checkout.total"):
+                for name, stage in (("validate", self._validate), ("commit_stock", self._commit_stock),
+                                    ("save_order", self._save_order), ("receipt", self._generate_receipt)):
+                    with METRICS.timer(f"checkout.{name}"):
+                        stage()
+            METRICS.count("checkout.lines", len(self.lines))
+        except CheckoutCancelled:
+            self.service.checkout_pending = False
+            self.events.put(("cancelled", None))
+        except Exception as e:
+            if self._saved:
+                self.receipt_error = str(e)
+                self.events.put(("done", None))
+                return
+            if self._committed:
+                self._restore_holds()
+            self.service.checkout_pending = False
+            self.events.put(("failed", str(e)))
+        else:
+            self.events.put(("done", self.receipt_path))
+
+    def _validate(self):
+        reservations = self.service.reservations
+        cart = self.service.cart
+        for done, (product, quantity, _) in enumerate(self.lines, start=1):
+            if reservations.held(cart, product.id) < quantity:
+                raise CartError(f"'{product.name}' is no longer reserved; please review your cart.")
+            self._progress(0, done, len(self.lines))
+
+    def _commit_stock(self):
+        if self._cancel.is_set():
+            raise CheckoutCancelled()
+        self._committed = True
+        self.service.reservations.commit(self.service.cart, self._ordered())
+        self._progress(1, 1, 1)
+
+    def _restore_holds(self):
+        # The order was never saved, so the committed units go back to being held by the cart
+        for product, quantity in self._ordered():
+            self.service.reservations.restore(self.service.cart, product, quantity)
+
+    def _save_order(self):
+        if self.order_sink is not None:
+            self.order_sink(self.order_id, [(product.id, quantity, total_paise) for product, quantity, total_paise in self.lines], self.total_paise)
+        self._saved = True
+        self._progress(2, 1, 1)
+
+    def receipt_lines(self):
+        return iter_receipt_lines(self.order_id, self.placed_at, self.lines, self.coupon, self.discount_paise, self.total_paise)
+
+    def _generate_receipt(self):
+        if self.receipt_path is not None:
+            write_receipt(self.receipt_path, self.receipt_lines(), title=f"ADH Cart Receipt {self.order_id}", progress=self._receipt_progress)
+        self._progress(3, 1, 1)
+
+    def _receipt_progress(self, written):
+        fraction = min(written / len(self.lines), 1)
+        self.events.put(("progress", (3 + fraction) / len(self.STAGES), self.STAGES[3]))
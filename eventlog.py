@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+
+LOG_NAME = "events.log"
+SNAPSHOT_NAME = "state.snapshot.json"
+
+
+def empty_state():
+    return {"stock": {}, "cart": {}, "coupon": None}
+
+
+def apply_event(state, event):
+    # Events carry absolute post-change values, so replaying one twice is harmless
+    op = event["op"]
+    if op in ("add", "update", "remove"):
+        state["stock"][event["id"]] = event["stock"]
+        if event["qty"]:
+            state["cart"][event["id"]] = event["qty"]
+        else:
+            state["cart"].pop(event["id"], None)
+    elif op == "abandon":
+        state["stock"].update(event["stock"])
+        state["cart"] = {}
+        state["coupon"] = None
+    elif op == "checkout":
+        # Lines still in the cart after the order (older logs emptied it entirely)
+        state["cart"] = dict(event.get("cart", {}))
+        state["coupon"] = None
+    elif op == "coupon":
+        state["coupon"] = event["code"]
+    return state
+
+
+class EventLog:
+    # Append-only JSON-lines log of cart and stock mutations with group commit: record()
+    # only buffers, and a writer thread writes and fsyncs whatever has accumulated every
+    # flush_interval seconds. Every snapshot_every events the folded state is written as an
+    # atomic snapshot and the log is truncated, so recovery only replays the tail.
+    def __init__(self, directory, flush_interval=0.05, snapshot_every=10_000):
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, LOG_NAME)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.state, self.seq = self._recover()
+        self._since_snapshot = 0
+        self._pending = []
+        self._lock = threading.Lock()  # guards state, seq and the pending buffer
+        self._io_lock = threading.Lock()  # serializes file writes; always taken before _lock
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._file = open(self.log_path, "a", encoding="utf-8")
+        self._writer = threading.Thread(target=self._write_loop, name="event-log-writer", daemon=True)
+        self._writer.start()
+
+    def _recover(self):
+        state, seq = empty_state(), 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            state, seq = snapshot["state"], snapshot["seq"]
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r+b") as f:
+                valid_length = 0
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    valid_length += len(line)
+                    if event["seq"] > seq:
+                        apply_event(state, event)
+                        seq = event["seq"]
+                # Drop a torn tail left by a crash so new appends start on a clean line
+                f.truncate(valid_length)
+        return state, seq
+
+    def record(self, event):
+        with self._lock:
+            self.seq += 1
+            event["seq"] = self.seq
+            apply_event(self.state, event)
+            self._pending.append(json.dumps(event, separators=(",", ":")))
+            self._since_snapshot += 1
+            compact = self._since_snapshot >= self.snapshot_every
+            self._wakeup.notify()
+        if compact:
+            self.compact()
+
+    def _take_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return pending
+
+    def _write(self, lines):
+        if lines:
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _write_loop(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+            # Let more events join this commit before paying for the fsync
+            time.sleep(self.flush_interval)
+            with self._io_lock:
+                self._write(self._take_pending())
+
+    def sync(self):
+        # Forces everything recorded so far to disk (e.g. before confirming an order)
+        with self._io_lock:
+            self._write(self._take_pending())
+
+    def compact(self):
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                snapshot = json.dumps({"seq": self.seq, "state": self.state}, separators=(",", ":"))
+                self._since_snapshot = 0
+            self._write(pending)
+            temp_path = self.snapshot_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(snapshot)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.snapshot_path)
+            # Everything in the log is now covered by the snapshot
+            self._file.close()
+            self._file = open(self.log_path, "w", encoding="utf-8")
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        self._writer.join()
+        with self._io_lock:
+            self._write(self._take_pending())
+            self._file.close()
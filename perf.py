@@ -0,0 +1,110 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# Latency samples kept per metric; older samples are dropped
+MAX_SAMPLES = 10_000
+
+
+# Shared no-op context manager handed out by timer() while disabled
+_NULL_TIMER = nullcontext()
+
+
+class Instrumentation:
+    # Low-overhead timers, counters and gauges. While disabled, timed() wrappers cost one
+    # attribute check per call and timer() hands back a no-op context manager.
+    def __init__(self, enabled=False, max_samples=MAX_SAMPLES):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._samples = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def record(self, name, seconds):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.max_samples)
+        samples.append(seconds)
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self._gauges[name] = value
+
+    def timer(self, name):
+        return self._timer(name) if self.enabled else _NULL_TIMER
+
+    @contextmanager
+    def _timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        self._samples.clear()
+        self._counters.clear()
+        self._gauges.clear()
+
+    def stats(self):
+        # {name: {"count", "p50_ms", "p99_ms", "max_ms", "mean_ms"}} for every timed metric
+        result = {}
+        for name, samples in list(self._samples.items()):
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            result[name] = {
+                "count": len(ordered),
+                "p50_ms": ordered[(len(ordered) - 1) // 2] * 1000,
+                "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+                "max_ms": ordered[-1] * 1000,
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+            }
+        return result
+
+    def counters(self):
+        return dict(self._counters)
+
+    def gauges(self):
+        return dict(self._gauges)
+
+    def export(self, path):
+        # Writes JSON or CSV depending on the file extension
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["kind", "name", "count", "p50_ms", "p99_ms", "max_ms", "mean_ms", "value"])
+                for name, stat in sorted(self.stats().items()):
+                    writer.writerow(["timer", name, stat["count"], f"{stat['p50_ms']:.4f}", f"{stat['p99_ms']:.4f}", f"{stat['max_ms']:.4f}", f"{stat['mean_ms']:.4f}", ""])
+                for name, value in sorted(self.counters().items()):
+                    writer.writerow(["counter", name, "", "", "", "", "", value])
+                for name, value in sorted(self.gauges().items()):
+                    writer.writerow(["gauge", name, "", "", "", "", "", value])
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"timestamp": time.time(), "timers": self.stats(), "counters": self.counters(), "gauges": self.gauges()}, f, indent=2)
+
+
+METRICS = Instrumentation(enabled=os.environ.get("ADH_CART_PERF", "") not in ("", "0"))
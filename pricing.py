@@ -0,0 +1,130 @@
+import json
+
+from cart_engine import Observable, to_paise
+
+
+def _basis_points(percent):
+    if not isinstance(percent, (int, float)) or not 0 < percent <= 100:
+        raise ValueError("Discount percent must be between 0 and 100.")
+    return round(percent * 100)
+
+
+def _apply_basis_points(amount_paise, basis_points):
+    # Integer rounding half up, so discounts never introduce float drift
+    return (amount_paise * (10_000 - basis_points) + 5_000) // 10_000
+
+
+# Rules
+class BulkDiscount:
+    # percent off the line when at least min_quantity units are bought; scoped to one
+    # product, one category, or (with neither) every product
+    def __init__(self, percent, min_quantity=1, product_id=None, category=None):
+        if not isinstance(min_quantity, int) or min_quantity <= 0:
+            raise ValueError("Discount min_quantity must be a positive integer.")
+        self.basis_points = _basis_points(percent)
+        self.percent = percent
+        self.min_quantity = min_quantity
+        self.product_id = product_id.strip().upper() if product_id else None
+        self.category = category.strip() if category else None
+
+
+class CategoryPromo(BulkDiscount):
+    def __init__(self, category, percent):
+        super().__init__(percent, category=category)
+
+
+class Coupon:
+    def __init__(self, code, percent=None, amount=None, min_total=0):
+        if (percent is None) == (amount is None):
+            raise ValueError("A coupon needs exactly one of percent or amount.")
+        # Amounts are checked in paise so sub-paisa values that round to nothing are rejected too
+        if amount is not None and (not isinstance(amount, (int, float)) or to_paise(amount) <= 0):
+            raise ValueError("Coupon amount must be positive.")
+        if not isinstance(min_total, (int, float)) or min_total < 0:
+            raise ValueError("Coupon minimum total cannot be negative.")
+        self.code = code.strip().upper()
+        self.basis_points = _basis_points(percent) if percent is not None else None
+        self.amount_paise = to_paise(amount) if amount is not None else None
+        self.min_total_paise = to_paise(min_total)
+
+    def discount_paise(self, subtotal_paise):
+        if subtotal_paise < self.min_total_paise:
+            return 0
+        if self.basis_points is not None:
+            return subtotal_paise - _apply_basis_points(subtotal_paise, self.basis_points)
+        return min(self.amount_paise, subtotal_paise)
+
+
+class PricingEngine(Observable):
+    # Rules are indexed by product ID and category, and each product's applicable tiers are
+    # compiled once into a list sorted by min_quantity. Resolved line totals are cached per
+    # (product, quantity); any rule change clears the caches and notifies carts to reprice.
+    # When several rules apply, the largest discount wins (rules do not stack).
+    def __init__(self, rules=(), coupons=()):
+        super().__init__()
+        self._by_product = {}
+        self._by_category = {}
+        self._global = []
+        self._coupons = {}
+        self._tiers = {}
+        self._line_totals = {}
+        for rule in rules:
+            self.add_rule(rule, notify=False)
+        for coupon in coupons:
+            self.add_coupon(coupon)
+
+    def add_rule(self, rule, notify=True):
+        if rule.product_id:
+            self._by_product.setdefault(rule.product_id, []).append(rule)
+        elif rule.category:
+            self._by_category.setdefault(rule.category, []).append(rule)
+        else:
+            self._global.append(rule)
+        self._invalidate(notify)
+
+    def remove_rule(self, rule):
+        for rules in (self._by_product.get(rule.product_id, []), self._by_category.get(rule.category, []), self._global):
+            if rule in rules:
+                rules.remove(rule)
+        self._invalidate(True)
+
+    def add_coupon(self, coupon):
+        self._coupons[coupon.code] = coupon
+
+    def has_coupon(self, code):
+        return code in self._coupons
+
+    def _invalidate(self, notify):
+        self._tiers.clear()
+        self._line_totals.clear()
+        if notify:
+            self._notify("reset")
+
+    def _compiled_tiers(self, product):
+        tiers = self._tiers.get(product.id)
+        if tiers is None:
+            rules = self._by_product.get(product.id, []) + self._by_category.get(product.category, []) + self._global
+            tiers = self._tiers[product.id] = sorted((rule.min_quantity, rule.basis_points) for rule in rules)
+        return tiers
+
+    def line_total_paise(self, product, quantity):
+        key = (product.id, quantity)
+        total = self._line_totals.get(key)
+        if total is None:
+            best = max((basis_points for min_quantity, basis_points in self._compiled_tiers(product) if min_quantity <= quantity), default=0)
+            total = self._line_totals[key] = _apply_basis_points(product.price_paise * quantity, best)
+        return total
+
+    def coupon_discount_paise(self, code, subtotal_paise):
+        coupon = self._coupons.get(code)
+        return coupon.discount_paise(subtotal_paise) if coupon else 0
+
+
+def load_promotions(path):
+    # JSON file: {"rules": [{"percent": 10, "min_quantity": 5, "category": "Audio"}, ...],
+    #             "coupons": [{"code": "WELCOME100", "amount": 100, "min_total": 1000}, ...]}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    rules = [BulkDiscount(**rule) for rule in data.get("rules", [])]
+    coupons = [Coupon(**coupon) for coupon in data.get("coupons", [])]
+    return PricingEngine(rules, coupons)
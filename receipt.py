@@ -0,0 +1,69 @@
+import time
+
+from cart_engine import format_money
+
+# Plain-text receipts are split into printable pages separated by form feeds
+RECEIPT_PAGE_LINES = 60
+# Lines buffered before each write, so exporting never holds the whole receipt in memory
+WRITE_CHUNK_LINES = 1000
+
+
+def item_line(number, name, quantity, total_paise):
+    return f"{number}. {name} (Qty: {quantity}) - {format_money(total_paise)}"
+
+
+def iter_cart_lines(cart, start=0, stop=None):
+    # Lines for cart items [start, stop), numbered from 1 like the cart tables
+    stop = len(cart) if stop is None else min(stop, len(cart))
+    for i in range(start, stop):
+        item = cart[i]
+        yield item_line(i + 1, item.product.name, item.quantity, item.total_paise())
+
+
+def iter_total_lines(coupon, discount_paise, total_paise):
+    if discount_paise:
+        yield f"Coupon {coupon}: -{format_money(discount_paise)}"
+    yield f"Final Total: {format_money(total_paise)}"
+
+
+def iter_summary_lines(cart):
+    if not cart:
+        yield "Your cart is empty."
+        return
+    yield "Your Shopping Cart:"
+    yield from iter_cart_lines(cart)
+
+
+def iter_receipt_lines(order_id, placed_at, lines, coupon, discount_paise, total_paise):
+    # lines are the (product, quantity, total_paise) tuples snapshotted by the checkout pipeline
+    yield f"ADH Cart - Order {order_id}"
+    yield time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(placed_at))
+    yield ""
+    for number, (product, quantity, line_total_paise) in enumerate(lines, start=1):
+        yield item_line(number, product.name, quantity, line_total_paise)
+    yield ""
+    yield from iter_total_lines(coupon, discount_paise, total_paise)
+
+
+def write_receipt(path, lines, title="ADH Cart Receipt", page_lines=RECEIPT_PAGE_LINES, progress=None):
+    # Streams lines into a paged text file: every page starts with a running header and pages
+    # are separated by form feeds. progress(lines_written) is called after each chunk.
+    written = 0
+    page = 0
+    buffer = []
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            if written % page_lines == 0:
+                page += 1
+                buffer.append(f"{chr(12) if page > 1 else ''}{title} - Page {page}\n\n")
+            buffer.append(line + "\n")
+            written += 1
+            if written % WRITE_CHUNK_LINES == 0:
+                f.write("".join(buffer))
+                buffer.clear()
+                if progress is not None:
+                    progress(written)
+        f.write("".join(buffer))
+    if progress is not None:
+        progress(written)
+    return written
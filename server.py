@@ -0,0 +1,375 @@
+import argparse
+import asyncio
+import functools
+import json
+import time
+import uuid
+from urllib.parse import parse_qs, urlsplit
+
+from cart_engine import (Cart, CartError, CartService, Catalog, CheckoutInProgressError, InsufficientStockError, InvalidItemError, OutOfStockError,
+                         Product, ProductNotFoundError, StockReservations, format_money)
+from pricing import load_promotions
+from receipt import iter_receipt_lines
+from snapshot import SnapshotCatalog, is_snapshot_path
+from storage import SQLiteStore, is_sqlite_path, load_catalog
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+# Idle sessions are dropped and their reserved stock returned after this many seconds
+SESSION_TTL = 30 * 60
+EXPIRE_INTERVAL = 30
+MAX_PAGE_SIZE = 500
+MAX_BODY_BYTES = 1 << 20
+# Connections idle for this long between requests are closed
+KEEP_ALIVE_TIMEOUT = 15
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _status_for(error):
+    if isinstance(error, (ProductNotFoundError, InvalidItemError)):
+        return 404
+    if isinstance(error, (OutOfStockError, InsufficientStockError, CheckoutInProgressError)):
+        return 409
+    return 400
+
+
+def product_json(product):
+    return {"id": product.id, "name": product.name, "price": format_money(product.price_paise),
+            "price_paise": product.price_paise, "stock": product.stock, "category": product.category}
+
+
+def cart_json(cart):
+    return {"items": [{"item": i + 1, "product_id": item.product.id, "name": item.product.name, "quantity": item.quantity,
+                       "total_paise": item.total_paise()} for i, item in enumerate(cart)],
+            "item_count": cart.item_count, "subtotal_paise": cart.subtotal_paise, "coupon": cart.coupon,
+            "discount_paise": cart.discount_paise, "total_paise": cart.total_paise, "total": format_money(cart.total_paise)}
+
+
+class CartServer:
+    # Serves one shared catalog and stock pool to many shoppers over HTTP/1.1 with keep-alive.
+    # Every request runs on the event loop thread, so cart and reservation updates never
+    # interleave; each session is its own CartService over the shared StockReservations.
+    # Slow work (building the search index, saving orders) runs on the default executor.
+    #
+    #   GET    /products?offset=&limit=      browse         GET /products/search?q=&limit=
+    #   GET    /products/<id>                one product    POST /sessions  -> {"session": id}
+    #   GET    /cart                         cart contents  POST /cart/items {"product_id", "quantity"}
+    #   PUT    /cart/items/<n>  {"quantity"} update item n  DELETE /cart/items/<n>
+    #   POST   /cart/coupon {"code"}         apply coupon   POST /checkout
+    #   DELETE /sessions                     abandon the cart and end the session
+    #
+    # Cart endpoints take the session ID in an X-Session-Id header.
+    def __init__(self, catalog, pricing=None, store=None, session_ttl=SESSION_TTL):
+        self.catalog = catalog
+        self.pricing = pricing
+        self.store = store
+        self.reservations = StockReservations(catalog, ttl=session_ttl)
+        self.sessions = {}
+        self.requests_served = 0
+        self._search_build = None
+        self._routes = [
+            ("GET", ("products",), self._list_products),
+            ("GET", ("products", "search"), self._search_products),
+            ("GET", ("products", None), self._get_product),
+            ("POST", ("sessions",), self._create_session),
+            ("DELETE", ("sessions",), self._end_session),
+            ("GET", ("cart",), self._get_cart),
+            ("POST", ("cart", "items"), self._add_item),
+            ("PUT", ("cart", "items", None), self._update_item),
+            ("DELETE", ("cart", "items", None), self._remove_item),
+            ("POST", ("cart", "coupon"), self._apply_coupon),
+            ("POST", ("checkout",), self._checkout),
+            ("GET", ("stats",), self._stats),
+        ]
+
+    # Routing
+    def _route(self, method, parts):
+        allowed = False
+        for route_method, pattern, handler in self._routes:
+            if len(pattern) == len(parts) and all(p is None or p == part for p, part in zip(pattern, parts)):
+                if route_method == method:
+                    return handler, [part for p, part in zip(pattern, parts) if p is None]
+                allowed = True
+        raise HTTPError(405 if allowed else 404, "Method not allowed." if allowed else "Not found.")
+
+    async def dispatch(self, method, target, headers, body):
+        # Returns (status, payload) for one request; handlers may be coroutines
+        url = urlsplit(target)
+        parts = tuple(part for part in url.path.split("/") if part)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        handler, args = self._route(method, parts)
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON.") from None
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must be a JSON object.")
+        request = {"query": query, "headers": headers, "data": data}
+        try:
+            result = handler(request, *args)
+            return await result if asyncio.iscoroutine(result) else result
+        except CartError as e:
+            return _status_for(e), {"error": str(e), "title": e.title}
+
+    def _session(self, request):
+        session_id = request["headers"].get("x-session-id", "")
+        service = self.sessions.get(session_id)
+        if service is None:
+            raise HTTPError(404, "Unknown or expired session; POST /sessions to start one.")
+        self.reservations.touch(service.cart)
+        return service
+
+    @staticmethod
+    def _int(value, name, default=None):
+        if value is None and default is not None:
+            return default
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise HTTPError(400, f"'{name}' must be a whole number.")
+        try:
+            return int(value)
+        except ValueError:
+            raise HTTPError(400, f"'{name}' must be a whole number.") from None
+
+    # Catalog
+    def _list_products(self, request):
+        offset = max(0, self._int(request["query"].get("offset"), "offset", 0))
+        limit = min(MAX_PAGE_SIZE, max(0, self._int(request["query"].get("limit"), "limit", 50)))
+        stop = min(len(self.catalog), offset + limit)
+        return 200, {"total": len(self.catalog), "offset": offset, "products": [product_json(self.catalog[i]) for i in range(offset, stop)]}
+
+    def _prepare_search(self):
+        # One shared index build off the event loop; searches that arrive before it finishes await it
+        if self._search_build is None or (self._search_build.done() and not self.catalog.search_ready):
+            self._search_build = asyncio.get_running_loop().run_in_executor(None, self.catalog.prepare_search)
+        return self._search_build
+
+    async def _search_products(self, request):
+        limit = min(MAX_PAGE_SIZE, max(0, self._int(request["query"].get("limit"), "limit", 20)))
+        if not self.catalog.search_ready:
+            # Shielded so a client hanging up does not cancel the build other requests are waiting on
+            await asyncio.shield(self._prepare_search())
+        return 200, {"products": [product_json(p) for p in self.catalog.search(request["query"].get("q", ""), limit)]}
+
+    def _get_product(self, request, product_id):
+        product = self.catalog.get(product_id)
+        if product is None:
+            raise HTTPError(404, f"Product with ID '{product_id.upper()}' not found.")
+        return 200, product_json(product)
+
+    # Sessions
+    def _create_session(self, request):
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = CartService(self.catalog, Cart(self.pricing), self.reservations)
+        self.reservations.touch(self.sessions[session_id].cart)
+        return 201, {"session": session_id}
+
+    def _end_session(self, request):
+        service = self._session(request)
+        service.abandon()
+        service.cart.close()
+        del self.sessions[request["headers"]["x-session-id"]]
+        return 200, {"ended": True}
+
+    def expire_sessions(self):
+        # Idle carts have already had their stock returned by the reservations; drop the sessions too
+        expired = set(self.reservations.expire())
+        for session_id, service in list(self.sessions.items()):
+            if service.cart in expired:
+                service.cart.clear()
+                service.cart.close()
+                del self.sessions[session_id]
+        return len(expired)
+
+    def close(self):
+        # Returns every session's reserved stock to the catalog and closes the store
+        for service in self.sessions.values():
+            service.abandon()
+            service.cart.close()
+        self.sessions.clear()
+        if self.store is not None:
+            self.store.close()
+
+    # Cart
+    def _get_cart(self, request):
+        return 200, cart_json(self._session(request).cart)
+
+    def _add_item(self, request):
+        service = self._session(request)
+        data = request["data"]
+        service.add(str(data.get("product_id", "")), self._int(data.get("quantity"), "quantity"))
+        return 200, cart_json(service.cart)
+
+    def _item_index(self, item):
+        return self._int(item, "item") - 1
+
+    def _update_item(self, request, item):
+        service = self._session(request)
+        result = service.update_quantity(self._item_index(item), self._int(request["data"].get("quantity"), "quantity"))
+        return 200, dict(cart_json(service.cart), result=result)
+
+    def _remove_item(self, request, item):
+        service = self._session(request)
+        service.remove(self._item_index(item))
+        return 200, cart_json(service.cart)
+
+    def _apply_coupon(self, request):
+        service = self._session(request)
+        service.apply_coupon(str(request["data"].get("code", "")))
+        return 200, cart_json(service.cart)
+
+    async def _checkout(self, request):
+        service = self._session(request)
+        cart = service.cart
+        if service.checkout_pending:
+            raise CheckoutInProgressError("An order is already being placed for this cart.")
+        if not cart:
+            raise CartError("Your cart is empty. Nothing to checkout.")
+        order_id = uuid.uuid4().hex[:12].upper()
+        coupon, discount_paise, total_paise = cart.coupon, cart.discount_paise, cart.total_paise
+        lines = [(item.product, item.quantity, item.total_paise()) for item in cart]
+        if self.store is not None:
+            # The order is saved before the holds are committed, so a failed save leaves the cart intact.
+            # Stock in the store only changes with sales, so units held by live sessions are never persisted as gone.
+            # Other requests run while the save is on the executor, so the cart is locked until it finishes.
+            save = functools.partial(self.store.save_order, order_id, [(product.id, quantity, line_total) for product, quantity, line_total in lines],
+                                     total_paise, decrement_stock=True)
+            service.checkout_pending = True
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, save)
+            finally:
+                service.checkout_pending = False
+        service.checkout()
+        receipt = list(iter_receipt_lines(order_id, time.time(), lines, coupon, discount_paise, total_paise))
+        return 200, {"order": order_id, "total_paise": total_paise, "total": format_money(total_paise), "receipt": receipt}
+
+    def _stats(self, request):
+        return 200, {"sessions": len(self.sessions), "requests": self.requests_served, "products": len(self.catalog)}
+
+    # HTTP
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                keep_alive = await self._handle_request(request_line, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, request_line, reader, writer):
+        # Returns whether the connection stays open
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            self._respond(writer, 400, {"error": "Malformed request line."}, False)
+            return False
+        keep_alive = headers.get("connection", "").lower() != "close" if version == "HTTP/1.1" else headers.get("connection", "").lower() == "keep-alive"
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._respond(writer, 400, {"error": "Invalid Content-Length."}, False)
+            return False
+        if length > MAX_BODY_BYTES:
+            self._respond(writer, 413, {"error": "Request body too large."}, False)
+            return False
+        body = await reader.readexactly(length) if length else b""
+
+        try:
+            status, payload = await self.dispatch(method.upper(), target, headers, body)
+        except HTTPError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"Internal error: {e}"}
+        self.requests_served += 1
+        self._respond(writer, status, payload, keep_alive)
+        return keep_alive
+
+    def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'OK')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+
+    async def _housekeeping_loop(self):
+        while True:
+            await asyncio.sleep(EXPIRE_INTERVAL)
+            self.expire_sessions()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        housekeeping = asyncio.create_task(self._housekeeping_loop())
+        self._prepare_search()
+        print(f"Serving {len(self.catalog):,} products on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            housekeeping.cancel()
+
+
+def demo_catalog(count, stock):
+    return Catalog(Product.from_trusted(f"P{i:06d}", f"Product {i}", 1000 + (i % 5000) * 25, stock) for i in range(count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ADH Cart multi-session HTTP/JSON server")
+    parser.add_argument("catalog", nargs="?", help="CSV, SQLite or .snap catalog (orders are saved when it is SQLite)")
+    parser.add_argument("--promotions", help="JSON file with discount rules and coupons")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--demo", type=int, default=10_000, help="size of the synthetic catalog used when no catalog is given")
+    parser.add_argument("--demo-stock", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    store = None
+    if args.catalog and is_snapshot_path(args.catalog):
+        catalog = SnapshotCatalog(args.catalog)
+    elif args.catalog:
+        catalog = Catalog()
+        rows, elapsed = load_catalog(args.catalog, catalog)
+        print(f"Loaded {rows:,} products from {args.catalog} in {elapsed:.2f}s")
+        if is_sqlite_path(args.catalog):
+            # Only orders (and the stock they sell) are persisted; carts live in memory with their sessions
+            store = SQLiteStore(args.catalog)
+    else:
+        catalog = demo_catalog(args.demo, args.demo_stock)
+    pricing = load_promotions(args.promotions) if args.promotions else None
+
+    server = CartServer(catalog, pricing, store)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import mmap
+import struct
+import time
+
+from cart_engine import STOCK_LOCK_STRIPES, Catalog, Product
+from storage import DEFAULT_BATCH_SIZE, iter_csv_batches, iter_sqlite_batches, is_sqlite_path
+
+# Layout: header | fixed-width records | ID index (record numbers sorted by ID) | string table
+SNAPSHOT_MAGIC = b"ADHSNAP2"
+SNAPSHOT_SUFFIX = ".snap"
+HEADER = struct.Struct("<8sQQQ")  # magic, record count, index offset, string table offset
+RECORD = struct.Struct("<IHIHqqIH")  # id offset/length, name offset/length, price_paise, stock, category offset/length
+INDEX_ENTRY = struct.Struct("<I")
+
+
+def is_snapshot_path(path):
+    return path.lower().endswith(SNAPSHOT_SUFFIX)
+
+
+def write_snapshot(products, path):
+    records = bytearray()
+    strings = bytearray()
+    ids = []
+    categories = {}  # category strings are stored once and shared between records
+    for product in products:
+        id_bytes = product.id.encode("utf-8")
+        name_bytes = product.name.encode("utf-8")
+        category = categories.get(product.category)
+        if category is None:
+            category_bytes = product.category.encode("utf-8")
+            category = categories[product.category] = (len(strings), len(category_bytes))
+            strings += category_bytes
+        records += RECORD.pack(len(strings), len(id_bytes), len(strings) + len(id_bytes), len(name_bytes), product.price_paise, product.stock, *category)
+        strings += id_bytes
+        strings += name_bytes
+        ids.append(id_bytes)
+
+    order = sorted(range(len(ids)), key=ids.__getitem__)
+    for previous, current in zip(order, order[1:]):
+        if ids[previous] == ids[current]:
+            raise ValueError(f"Duplicate product ID '{ids[current].decode('utf-8')}'.")
+    index = struct.pack(f"<{len(order)}I", *order)
+
+    index_offset = HEADER.size + len(records)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(SNAPSHOT_MAGIC, len(ids), index_offset, index_offset + len(index)))
+        f.write(records)
+        f.write(index)
+        f.write(strings)
+    return len(ids)
+
+
+class SnapshotCatalog(Catalog):
+    # Read-only, mmap-backed catalog. Opening costs O(1) regardless of size: records are
+    # decoded into Product objects only when accessed, and then cached so stock changes stick.
+    def __init__(self, path, lock_stripes=STOCK_LOCK_STRIPES):
+        super().__init__(lock_stripes=lock_stripes)
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._index_offset, self._strings_offset = HEADER.unpack_from(self._map, 0)
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an ADH Cart catalog snapshot.")
+        self._materialized = {}
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+
+    def __getitem__(self, position):
+        product = self._materialized.get(position)
+        if product is None:
+            if not 0 <= position < self._count:
+                raise IndexError("catalog position out of range")
+            id_offset, id_length, name_offset, name_length, price_paise, stock, category_offset, category_length = self._record(position)
+            product = self._materialized[position] = Product.from_trusted(self._string(id_offset, id_length), self._string(name_offset, name_length),
+                                                                          price_paise, stock, self._string(category_offset, category_length))
+        return product
+
+    def add(self, product):
+        raise TypeError("Snapshot catalogs are read-only; rebuild the snapshot to add products.")
+
+    def extend(self, products):
+        if products:
+            raise TypeError("Snapshot catalogs are read-only; rebuild the snapshot to add products.")
+
+    def _record(self, position):
+        return RECORD.unpack_from(self._map, HEADER.size + position * RECORD.size)
+
+    def _string(self, offset, length):
+        start = self._strings_offset + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def _id_bytes(self, position):
+        id_offset, id_length = struct.unpack_from("<IH", self._map, HEADER.size + position * RECORD.size)
+        start = self._strings_offset + id_offset
+        return self._map[start:start + id_length]
+
+    def position_of(self, product_id):
+        position = self._search(product_id.encode("utf-8"))
+        if position is None:
+            position = self._search(product_id.strip().upper().encode("utf-8"))
+        return position
+
+    def _search(self, key):
+        # Binary search over the sorted ID index, reading IDs straight out of the map
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            position = INDEX_ENTRY.unpack_from(self._map, self._index_offset + middle * INDEX_ENTRY.size)[0]
+            if self._id_bytes(position) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count:
+            position = INDEX_ENTRY.unpack_from(self._map, self._index_offset + low * INDEX_ENTRY.size)[0]
+            if self._id_bytes(position) == key:
+                return position
+        return None
+
+    def _ids(self):
+        for position in range(self._count):
+            yield self._id_bytes(position).decode("utf-8")
+
+    def _names(self):
+        for position in range(self._count):
+            _, _, name_offset, name_length, _, _, _, _ = self._record(position)
+            yield self._string(name_offset, name_length)
+
+    def _prices(self):
+        for position in range(self._count):
+            yield self._record(position)[4]
+
+    def _stocks(self):
+        # Materialized products carry the live stock; the rest still match the file
+        for position in range(self._count):
+            product = self._materialized.get(position)
+            yield product.stock if product is not None else self._record(position)[5]
+
+    def _price_at(self, position):
+        return self._record(position)[4]
+
+    def _stock_at(self, position):
+        product = self._materialized.get(position)
+        return product.stock if product is not None else self._record(position)[5]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a CSV or SQLite catalog into a binary snapshot")
+    parser.add_argument("source")
+    parser.add_argument("snapshot_path")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    batches = iter_sqlite_batches(args.source, args.batch_size) if is_sqlite_path(args.source) else iter_csv_batches(args.source, args.batch_size)
+    start = time.perf_counter()
+    count = write_snapshot((product for batch in batches for product in batch), args.snapshot_path)
+    print(f"Wrote {count:,} products to {args.snapshot_path} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
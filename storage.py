@@ -0,0 +1,207 @@
+import argparse
+import csv
+import os
+import sqlite3
+import time
+
+from cart_engine import Product, to_paise
+
+DEFAULT_BATCH_SIZE = 10_000
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    price_paise INTEGER NOT NULL CHECK (price_paise > 0),
+    stock INTEGER NOT NULL CHECK (stock >= 0),
+    category TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    placed_at REAL NOT NULL,
+    total_paise INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS order_lines (
+    order_id TEXT NOT NULL REFERENCES orders(id),
+    product_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    total_paise INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cart_lines (
+    position INTEGER PRIMARY KEY,
+    product_id TEXT NOT NULL REFERENCES products(id),
+    quantity INTEGER NOT NULL CHECK (quantity > 0)
+);
+"""
+
+
+def _migrate(connection):
+    # Stores created before categories existed get the column added in place
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(products)")}
+    if columns and "category" not in columns:
+        with connection:
+            connection.execute("ALTER TABLE products ADD COLUMN category TEXT NOT NULL DEFAULT ''")
+
+
+def is_sqlite_path(path):
+    return path.lower().endswith(SQLITE_SUFFIXES)
+
+
+# Loading
+def iter_csv_batches(path, batch_size=DEFAULT_BATCH_SIZE):
+    # Expects a header row with id,name,price,stock and an optional category column (price in rupees)
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = [column.strip().lower() for column in next(reader, [])]
+        if header[:4] != ["id", "name", "price", "stock"]:
+            raise ValueError(f"{path}: expected a header of id,name,price,stock.")
+        has_category = header[4:5] == ["category"]
+
+        batch = []
+        for line_number, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            try:
+                product_id, name, price, stock = row[:4]
+                price_paise, stock = to_paise(float(price)), int(stock)
+            except (ValueError, OverflowError):  # OverflowError: a price of inf
+                raise ValueError(f"{path}:{line_number}: malformed row {row!r}.") from None
+            product_id = product_id.strip().upper()
+            if not product_id:
+                raise ValueError(f"{path}:{line_number}: product ID is empty.")
+            if price_paise <= 0 or stock < 0:
+                raise ValueError(f"{path}:{line_number}: price must be positive and stock non-negative.")
+            category = row[4].strip() if has_category and len(row) > 4 else ""
+            batch.append(Product.from_trusted(product_id, name.strip(), price_paise, stock, category))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def iter_sqlite_batches(path, batch_size=DEFAULT_BATCH_SIZE):
+    connection = sqlite3.connect(path)
+    try:
+        _migrate(connection)
+        cursor = connection.execute("SELECT id, name, price_paise, stock, category FROM products ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [Product.from_trusted(*row) for row in rows]
+    finally:
+        connection.close()
+
+
+def load_catalog(path, catalog, batch_size=DEFAULT_BATCH_SIZE):
+    # Streams batches into the catalog and returns (rows, seconds)
+    batches = iter_sqlite_batches(path, batch_size) if is_sqlite_path(path) else iter_csv_batches(path, batch_size)
+    start = time.perf_counter()
+    rows = 0
+    for batch in batches:
+        catalog.extend(batch)
+        rows += len(batch)
+    return rows, time.perf_counter() - start
+
+
+# Persistence
+class SQLiteStore:
+    # Persists stock levels and the cart. Changes are collected from the catalog and cart
+    # observers and written by flush() in a single transaction.
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        _migrate(self.connection)
+        self.connection.executescript(SCHEMA)
+        self._catalog = None
+        self._cart = None
+        self._pending_stock = {}
+        self._cart_dirty = False
+
+    def save_products(self, batches):
+        # Writes batches of products (as yielded by iter_*_batches) in one transaction
+        rows = 0
+        with self.connection:
+            for batch in batches:
+                self.connection.executemany("INSERT OR REPLACE INTO products (id, name, price_paise, stock, category) VALUES (?, ?, ?, ?, ?)",
+                                            [(p.id, p.name, p.price_paise, p.stock, p.category) for p in batch])
+                rows += len(batch)
+        return rows
+
+    def save_order(self, order_id, lines, total_paise, decrement_stock=False):
+        # Called from the checkout worker thread, so it uses its own connection. Callers that
+        # do not watch() the catalog pass decrement_stock to persist the sale in the same transaction.
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                connection.execute("INSERT INTO orders (id, placed_at, total_paise) VALUES (?, ?, ?)", (order_id, time.time(), total_paise))
+                connection.executemany("INSERT INTO order_lines (order_id, product_id, quantity, total_paise) VALUES (?, ?, ?, ?)",
+                                       [(order_id, product_id, quantity, line_total) for product_id, quantity, line_total in lines])
+                if decrement_stock:
+                    connection.executemany("UPDATE products SET stock = stock - ? WHERE id = ?",
+                                           [(quantity, product_id) for product_id, quantity, _ in lines])
+        finally:
+            connection.close()
+
+    def load_cart(self, catalog):
+        rows = self.connection.execute("SELECT product_id, quantity FROM cart_lines ORDER BY position")
+        for product_id, quantity in rows:
+            product = catalog.get(product_id)
+            if product is not None:
+                yield product, quantity
+
+    def watch(self, catalog, cart):
+        self._catalog = catalog
+        self._cart = cart
+        catalog.subscribe(self._on_catalog_change, every_event=True)
+        cart.subscribe(self._on_cart_change, every_event=True)
+
+    def _on_catalog_change(self, event, index):
+        if event == "stock":
+            product = self._catalog[index]
+            self._pending_stock[product.id] = product.stock
+
+    def _on_cart_change(self, event, index):
+        self._cart_dirty = True
+
+    def flush(self):
+        if not self._pending_stock and not self._cart_dirty:
+            return
+        pending, self._pending_stock = self._pending_stock, {}
+        with self.connection:
+            self.connection.executemany("UPDATE products SET stock = ? WHERE id = ?", [(stock, product_id) for product_id, stock in pending.items()])
+            if self._cart_dirty:
+                self._cart_dirty = False
+                self.connection.execute("DELETE FROM cart_lines")
+                self.connection.executemany("INSERT INTO cart_lines (position, product_id, quantity) VALUES (?, ?, ?)",
+                                            [(i, item.product.id, item.quantity) for i, item in enumerate(self._cart)])
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ADH Cart catalog storage tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    import_parser = subcommands.add_parser("import", help="import a CSV catalog into a SQLite store")
+    import_parser.add_argument("csv_path")
+    import_parser.add_argument("db_path")
+    import_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        if not os.path.exists(args.csv_path):
+            parser.error(f"{args.csv_path} does not exist.")
+        store = SQLiteStore(args.db_path)
+        start = time.perf_counter()
+        rows = store.save_products(iter_csv_batches(args.csv_path, args.batch_size))
+        store.close()
+        elapsed = time.perf_counter() - start
+        print(f"Imported {rows:,} products into {args.db_path} in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import pytest
+
+from cart_engine import (Cart, CartService, Catalog, InsufficientStockError, InvalidItemError, InvalidQuantityError, OutOfStockError,
+                         Product, ProductNotFoundError)
+from perf import METRICS
+
+
+@pytest.fixture
+def service():
+    catalog = Catalog([Product("P1", "Mouse", 10.0, 5), Product("P2", "Cable", 2.5, 0), Product("P3", "Pad", 1.0, 3)])
+    return CartService(catalog, Cart())
+
+
+def test_add_reserves_stock_and_merges_lines(service):
+    service.add("p1", 2)
+    service.add("P1", 1)
+    assert len(service.cart) == 1
+    assert service.cart.find("P1").quantity == 3
+    assert service.catalog.get("P1").stock == 2
+    assert service.total_paise() == 3000
+
+
+def test_add_errors(service):
+    with pytest.raises(ProductNotFoundError):
+        service.add("NOPE", 1)
+    with pytest.raises(OutOfStockError):
+        service.add("P2", 1)
+    with pytest.raises(InsufficientStockError):
+        service.add("P1", 6)
+    with pytest.raises(InvalidQuantityError):
+        service.add("P1", 0)
+    assert service.catalog.get("P1").stock == 5
+
+
+def test_update_quantity_moves_stock_both_ways(service):
+    service.add("P1", 2)
+    assert service.update_quantity(0, 2) == "unchanged"
+    assert service.update_quantity(0, 5) == "updated"
+    assert service.catalog.get("P1").stock == 0
+    with pytest.raises(InsufficientStockError):
+        service.update_quantity(0, 6)
+    assert service.update_quantity(0, 1) == "updated"
+    assert service.catalog.get("P1").stock == 4
+    assert service.update_quantity(0, 0) == "removed"
+    assert service.catalog.get("P1").stock == 5
+    with pytest.raises(InvalidItemError):
+        service.update_quantity(0, 1)
+
+
+def test_remove_and_abandon_return_stock(service):
+    service.add("P1", 2)
+    service.add("P3", 3)
+    service.remove(0)
+    assert service.catalog.get("P1").stock == 5
+    assert service.cart.find("P3") is not None
+    service.abandon()
+    assert service.catalog.get("P3").stock == 3
+    assert len(service.cart) == 0
+
+
+def test_checkout_keeps_stock_sold(service):
+    service.add("P1", 2)
+    order = service.checkout()
+    assert order == [("P1", "Mouse", 2, 2000)]
+    assert len(service.cart) == 0
+    assert service.catalog.get("P1").stock == 3
+    assert service.reservations.held(service.cart, "P1") == 0
+
+
+def test_add_many_reports_failures_per_line(service):
+    added, failures = service.add_many([("P1", 2), ("P2", 1), ("NOPE", 1), ("P3", 1)])
+    assert added == 3
+    assert [(index, product_id) for index, product_id, _ in failures] == [(1, "P2"), (2, "NOPE")]
+
+
+def test_add_times_the_catalog_lookup(service):
+    METRICS.enabled = True
+    try:
+        service.add("P1", 1)
+        assert METRICS.stats()["catalog.get"]["count"] == 1
+    finally:
+        METRICS.enabled = False
+        METRICS.reset()
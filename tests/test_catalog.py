@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from cart_engine import Catalog, Product, StockIndex
+
+
+def brute_force(catalog, sort="position", descending=False, price_range=None, stock_range=None):
+    def within(value, bounds):
+        return bounds is None or ((bounds[0] is None or value >= bounds[0]) and (bounds[1] is None or value <= bounds[1]))
+    keys = {"position": lambda p: p, "name": lambda p: (catalog[p].name.lower(), p),
+            "price": lambda p: (catalog[p].price_paise, p), "stock": lambda p: (catalog[p].stock, p)}
+    positions = [p for p in range(len(catalog)) if within(catalog[p].price_paise, price_range) and within(catalog[p].stock, stock_range)]
+    positions.sort(key=keys[sort])
+    return positions[::-1] if descending else positions
+
+
+@pytest.fixture
+def catalog():
+    rng = random.Random(7)
+    return Catalog(Product.from_trusted(f"P{i:04d}", f"Item {rng.choice('abcde')}{i}", rng.randint(100, 5_000), rng.randint(0, 20))
+                   for i in range(300))
+
+
+def test_stock_index_moves(monkeypatch):
+    monkeypatch.setattr(StockIndex, "CHUNK_SIZE", 4)
+    rng = random.Random(1)
+    stocks = [rng.randint(0, 5) for _ in range(50)]
+    index = StockIndex(sorted(range(50), key=lambda p: (stocks[p], p)), stocks)
+    for _ in range(500):
+        position, new_stock = rng.randrange(50), rng.randint(0, 5)
+        index.move(position, stocks[position], new_stock)
+        stocks[position] = new_stock
+    expected = sorted(range(50), key=lambda p: (stocks[p], p))
+    assert len(index) == 50
+    assert index[:] == expected
+    assert [index[rank] for rank in range(50)] == expected
+    assert index[10:20] == expected[10:20]
+    for stock in range(-1, 7):
+        assert index.bisect_left(stock) == sum(s < stock for s in stocks)
+        assert index.bisect_right(stock) == sum(s <= stock for s in stocks)
+
+
+@pytest.mark.parametrize("sort", Catalog.SORT_KEYS)
+@pytest.mark.parametrize("descending", [False, True])
+def test_query_matches_brute_force(catalog, sort, descending):
+    for price_range, stock_range in [(None, None), ((1_000, 3_000), None), (None, (5, None)), ((None, 2_000), (0, 10))]:
+        result = catalog.query(sort, descending, price_range, stock_range)
+        assert list(result) == brute_force(catalog, sort, descending, price_range, stock_range)
+
+
+def test_query_follows_stock_changes(catalog):
+    catalog.query("stock")
+    rng = random.Random(3)
+    for _ in range(200):
+        product = catalog[rng.randrange(len(catalog))]
+        catalog.adjust_stock(product, rng.randint(-product.stock, 5))
+    assert list(catalog.query("stock")) == brute_force(catalog, "stock")
+    assert list(catalog.query("price", stock_range=(3, 8))) == brute_force(catalog, "price", stock_range=(3, 8))
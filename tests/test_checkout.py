@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+
+from cart_engine import Cart, CartService, Catalog, CheckoutInProgressError, Product
+from checkout import CheckoutPipeline
+
+
+def make_service():
+    catalog = Catalog([Product("P1", "Mouse", 10.0, 10), Product("P2", "Cable", 5.0, 10)])
+    return CartService(catalog, Cart())
+
+
+def drain(pipeline):
+    events = []
+    while not pipeline.events.empty():
+        events.append(pipeline.events.get())
+    return events
+
+
+def test_cart_is_locked_while_checkout_runs():
+    service = make_service()
+    service.add("P1", 2)
+    saving = threading.Event()
+    release = threading.Event()
+
+    def slow_sink(order_id, lines, total_paise):
+        saving.set()
+        release.wait(5)
+
+    pipeline = CheckoutPipeline(service, order_sink=slow_sink)
+    pipeline.start()
+    assert saving.wait(5)
+    with pytest.raises(CheckoutInProgressError):
+        service.add("P2", 3)
+    with pytest.raises(CheckoutInProgressError):
+        service.update_quantity(0, 1)
+    release.set()
+    pipeline.wait(5)
+    assert drain(pipeline)[-1][0] == "done"
+    pipeline.finish()
+
+    assert len(service.cart) == 0
+    assert service.catalog.get("P1").stock == 8
+    assert service.catalog.get("P2").stock == 10
+    service.add("P2", 1)
+
+
+def test_commit_and_finish_only_touch_ordered_lines():
+    service = make_service()
+    service.add("P1", 2)
+    p1, p2 = service.catalog.get("P1"), service.catalog.get("P2")
+    ordered = [(p1, 2)]
+    service.add("P2", 3)
+    service.reservations.commit(service.cart, ordered)
+    service.finish_checkout("ORDER", ordered)
+
+    assert service.cart.find("P1") is None
+    assert service.cart.find("P2").quantity == 3
+    assert service.reservations.held(service.cart, "P2") == 3
+    service.abandon()
+    assert p2.stock == 10
+    assert p1.stock == 8
+
+
+def test_cancel_unlocks_cart():
+    service = make_service()
+    service.add("P1", 1)
+    pipeline = CheckoutPipeline(service)
+    pipeline.cancel()
+    pipeline.start()
+    pipeline.wait(5)
+    assert drain(pipeline)[-1][0] == "cancelled"
+    assert service.catalog.get("P1").stock == 9
+    service.add("P1", 1)
+    assert service.cart.find("P1").quantity == 2
+
+
+def test_failing_order_sink_puts_holds_back():
+    service = make_service()
+    service.add("P1", 2)
+
+    def failing_sink(order_id, lines, total_paise):
+        raise OSError("disk full")
+
+    pipeline = CheckoutPipeline(service, order_sink=failing_sink)
+    pipeline.start()
+    pipeline.wait(5)
+    assert drain(pipeline)[-1] == ("failed", "disk full")
+    assert service.reservations.held(service.cart, "P1") == 2
+    assert service.catalog.get("P1").stock == 8
+
+    pipeline = CheckoutPipeline(service)
+    pipeline.start()
+    pipeline.wait(5)
+    assert drain(pipeline)[-1][0] == "done"
+    pipeline.finish()
+    assert len(service.cart) == 0
+    assert service.catalog.get("P1").stock == 8
+
+
+def test_receipt_failure_still_places_the_order(tmp_path):
+    service = make_service()
+    service.add("P1", 2)
+    pipeline = CheckoutPipeline(service, receipt_dir=str(tmp_path / "missing"))
+    pipeline.start()
+    pipeline.wait(5)
+    assert drain(pipeline)[-1] == ("done", None)
+    assert pipeline.receipt_error
+    pipeline.finish()
+    assert len(service.cart) == 0
+    assert service.catalog.get("P1").stock == 8
+    service.add("P1", 1)
+    service.remove(0)
+    assert service.catalog.get("P1").stock == 8
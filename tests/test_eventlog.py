@@ -0,0 +1,37 @@
+from eventlog import EventLog
+
+
+def test_recovery_drops_a_torn_tail(tmp_path):
+    journal = EventLog(str(tmp_path), flush_interval=0)
+    journal.record({"op": "add", "id": "P1", "qty": 2, "stock": 8})
+    journal.record({"op": "add", "id": "P2", "qty": 1, "stock": 4})
+    journal.close()
+    with open(journal.log_path, "ab") as f:
+        f.write(b'{"op":"update","id":"P1","qty":5,"st')
+    valid_size = (tmp_path / "events.log").stat().st_size - len(b'{"op":"update","id":"P1","qty":5,"st')
+
+    journal = EventLog(str(tmp_path), flush_interval=0)
+    assert journal.state["cart"] == {"P1": 2, "P2": 1}
+    assert journal.state["stock"] == {"P1": 8, "P2": 4}
+    assert journal.seq == 2
+    assert (tmp_path / "events.log").stat().st_size == valid_size
+    journal.record({"op": "remove", "id": "P2", "qty": 0, "stock": 5})
+    journal.close()
+
+    journal = EventLog(str(tmp_path), flush_interval=0)
+    assert journal.state["cart"] == {"P1": 2}
+    assert journal.seq == 3
+    journal.close()
+
+
+def test_recovery_replays_the_log_after_a_snapshot(tmp_path):
+    journal = EventLog(str(tmp_path), flush_interval=0, snapshot_every=2)
+    journal.record({"op": "add", "id": "P1", "qty": 1, "stock": 9})
+    journal.record({"op": "coupon", "code": "SAVE10"})
+    journal.record({"op": "update", "id": "P1", "qty": 4, "stock": 6})
+    journal.close()
+
+    journal = EventLog(str(tmp_path), flush_interval=0)
+    assert journal.state == {"stock": {"P1": 6}, "cart": {"P1": 4}, "coupon": "SAVE10"}
+    assert journal.seq == 3
+    journal.close()
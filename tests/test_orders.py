@@ -0,0 +1,13 @@
+from cart_engine import parse_order_text
+
+
+def test_parse_order_text():
+    lines, errors = parse_order_text("id,quantity\nP1, 2\n# note\n\nP3\t4\nP9 x\nbad line here")
+    assert lines == [(2, "P1", 2), (5, "P3", 4)]
+    assert [line_number for line_number, _ in errors] == [6, 7]
+
+
+def test_parse_order_text_only_skips_a_real_header():
+    lines, errors = parse_order_text("P001 two\nP002 3")
+    assert lines == [(2, "P002", 3)]
+    assert errors[0][0] == 1
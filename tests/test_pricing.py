@@ -0,0 +1,78 @@
+import pytest
+
+from cart_engine import Cart, CartService, Catalog, InvalidCouponError, Product
+from pricing import BulkDiscount, CategoryPromo, Coupon, PricingEngine
+
+
+@pytest.fixture
+def service():
+    catalog = Catalog([Product("P1", "Headphones", 1000.0, 50, "Audio"), Product("P2", "Cable", 99.99, 50, "Accessories")])
+    pricing = PricingEngine([BulkDiscount(5, min_quantity=3, product_id="P1"), BulkDiscount(12.5, min_quantity=10, product_id="P1"),
+                             CategoryPromo("Accessories", 10)],
+                            [Coupon("flat200", amount=200, min_total=5000), Coupon("ten", percent=10)])
+    return CartService(catalog, Cart(pricing))
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"amount": 0},
+    {"amount": -50},
+    {"amount": 0.001},
+    {"amount": "100"},
+    {"percent": 0},
+    {"percent": 101},
+    {"amount": 100, "min_total": -1},
+    {"percent": 10, "amount": 100},
+    {},
+])
+def test_coupon_rejects_invalid_terms(kwargs):
+    with pytest.raises(ValueError):
+        Coupon("SAVE", **kwargs)
+
+
+def test_coupon_discount():
+    assert Coupon("flat", amount=100, min_total=500).discount_paise(49_999) == 0
+    assert Coupon("flat", amount=100, min_total=500).discount_paise(50_000) == 10_000
+    assert Coupon("flat", amount=100).discount_paise(4_000) == 4_000
+    assert Coupon("ten", percent=10).discount_paise(12_345) == 1_234
+
+
+def test_largest_tier_wins(service):
+    service.add("P1", 2)
+    assert service.cart.subtotal_paise == 200_000
+    service.update_quantity(0, 3)
+    assert service.cart.subtotal_paise == 285_000
+    service.update_quantity(0, 10)
+    assert service.cart.subtotal_paise == 875_000
+
+
+def test_category_promo_rounds_half_up(service):
+    service.add("P2", 1)
+    assert service.cart.subtotal_paise == 8_999
+    service.add("P2", 2)
+    assert service.cart.subtotal_paise == 26_997
+
+
+def test_rule_changes_reprice_the_cart(service):
+    service.add("P1", 1)
+    rule = BulkDiscount(50, category="Audio")
+    service.cart.pricing.add_rule(rule)
+    assert service.cart.subtotal_paise == 50_000
+    service.cart.pricing.remove_rule(rule)
+    assert service.cart.subtotal_paise == 100_000
+
+
+def test_coupon_totals(service):
+    service.add("P1", 4)
+    service.apply_coupon(" flat200 ")
+    assert service.cart.subtotal_paise == 380_000
+    assert service.total_paise() == 380_000
+    service.update_quantity(0, 6)
+    assert service.cart.discount_paise == 20_000
+    assert service.total_paise() == 550_000
+    service.apply_coupon("TEN")
+    assert service.total_paise() == 513_000
+    with pytest.raises(InvalidCouponError):
+        service.apply_coupon("NOPE")
+    assert service.cart.coupon == "TEN"
+    service.apply_coupon("")
+    assert service.total_paise() == 570_000
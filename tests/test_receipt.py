@@ -0,0 +1,22 @@
+from receipt import WRITE_CHUNK_LINES, iter_total_lines, write_receipt
+
+
+def test_write_receipt_streams_pages(tmp_path):
+    path = tmp_path / "receipt.txt"
+    progress = []
+    count = WRITE_CHUNK_LINES * 2 + 5
+    written = write_receipt(str(path), (f"line {i}" for i in range(count)), title="Receipt", page_lines=100, progress=progress.append)
+
+    assert written == count
+    assert progress == [WRITE_CHUNK_LINES, WRITE_CHUNK_LINES * 2, count]
+    pages = path.read_text(encoding="utf-8").split("\f")
+    assert len(pages) == -(-count // 100)
+    assert pages[0].startswith("Receipt - Page 1\n\nline 0\n")
+    assert pages[1].startswith("Receipt - Page 2\n\nline 100\n")
+    assert pages[-1].endswith(f"line {count - 1}\n")
+    assert all(len(page.splitlines()) == 102 for page in pages[:-1])
+
+
+def test_iter_total_lines():
+    assert list(iter_total_lines(None, 0, 12_345)) == ["Final Total: ₹123.45"]
+    assert list(iter_total_lines("SAVE", 500, 12_345)) == ["Coupon SAVE: -₹5.00", "Final Total: ₹123.45"]
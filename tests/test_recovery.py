@@ -0,0 +1,53 @@
+from cart_engine import Cart, CartService, Catalog, Product
+from eventlog import EventLog
+from storage import SQLiteStore, load_catalog
+
+
+def start(db_path, journal_dir):
+    # Mirrors OnlineCartApp's startup: SQLite cart restore, then journal recovery
+    catalog = Catalog()
+    load_catalog(db_path, catalog)
+    service = CartService(catalog, Cart())
+    store = SQLiteStore(db_path)
+    service.restore(store.load_cart(catalog))
+    store.watch(catalog, service.cart)
+    journal = EventLog(journal_dir, flush_interval=0)
+    service.recover(journal.state)
+    service.journal = journal
+    return catalog, service, store, journal
+
+
+def stop(store, journal):
+    journal.close()
+    store.close()
+
+
+def test_restart_with_store_and_journal_restores_cart_once(tmp_path):
+    db_path = str(tmp_path / "shop.db")
+    seed = SQLiteStore(db_path)
+    seed.save_products([[Product("P1", "Mouse", 10.0, 10)]])
+    seed.close()
+
+    catalog, service, store, journal = start(db_path, str(tmp_path / "journal"))
+    service.add("P1", 3)
+    stop(store, journal)
+
+    catalog, service, store, journal = start(db_path, str(tmp_path / "journal"))
+    product = catalog.get("P1")
+    assert service.cart.find("P1").quantity == 3
+    assert service.reservations.held(service.cart, "P1") == 3
+    assert product.stock == 7
+
+    service.abandon()
+    assert product.stock == 10
+    stop(store, journal)
+
+
+def test_recover_replaces_previously_restored_cart(tmp_path):
+    catalog = Catalog([Product("P1", "Mouse", 10.0, 5)])
+    service = CartService(catalog, Cart())
+    service.restore([(catalog.get("P1"), 2)])
+    service.recover({"stock": {"P1": 4}, "cart": {"P1": 1}, "coupon": None})
+    assert service.cart.find("P1").quantity == 1
+    assert service.reservations.held(service.cart, "P1") == 1
+    assert catalog.get("P1").stock == 4
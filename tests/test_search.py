@@ -0,0 +1,33 @@
+import threading
+
+from cart_engine import Catalog, Product
+
+
+def make_catalog():
+    return Catalog([Product("P001", "Wireless Mouse", 25.0, 5), Product("P002", "Mouse Pad", 5.0, 9), Product("K001", "Keyboard", 30.0, 2)])
+
+
+def test_prepare_search_on_a_worker_thread():
+    catalog = make_catalog()
+    assert not catalog.search_ready
+    worker = threading.Thread(target=catalog.prepare_search)
+    worker.start()
+    worker.join()
+    assert catalog.search_ready
+    assert [p.id for p in catalog.search("mou")] == ["P001", "P002"]
+    assert [p.id for p in catalog.search("k")] == ["K001"]
+
+
+def test_stale_search_index_is_not_published():
+    catalog = make_catalog()
+    names = catalog._names
+
+    def extend_mid_build():
+        catalog.extend([Product("P003", "Mouse Bungee", 9.0, 1)])
+        return names()
+    catalog._names = extend_mid_build
+    catalog.prepare_search()
+    assert not catalog.search_ready
+    del catalog._names
+    assert [p.id for p in catalog.search("mouse")] == ["P001", "P002", "P003"]
+    assert catalog.search_ready
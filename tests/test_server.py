@@ -0,0 +1,185 @@
+import asyncio
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from cart_engine import Catalog, Product
+from pricing import BulkDiscount, PricingEngine
+from server import CartServer, HTTPError, demo_catalog
+from storage import SQLiteStore, load_catalog
+
+
+async def open_session(server):
+    status, payload = await server.dispatch("POST", "/sessions", {}, b"")
+    assert status == 201
+    return {"x-session-id": payload["session"]}
+
+
+def start_session(server):
+    return asyncio.run(open_session(server))
+
+
+def request(server, method, target, headers, data=None):
+    return server.dispatch(method, target, headers, json.dumps(data).encode() if data is not None else b"")
+
+
+def call(server, method, target, headers, data=None):
+    return asyncio.run(request(server, method, target, headers, data))
+
+
+def test_session_cart_and_checkout():
+    server = CartServer(demo_catalog(10, 5))
+    headers = start_session(server)
+    status, cart = call(server, "POST", "/cart/items", headers, {"product_id": "p000001", "quantity": 3})
+    assert status == 200 and cart["item_count"] == 3
+    status, payload = call(server, "POST", "/cart/items", headers, {"product_id": "P000001", "quantity": 3})
+    assert status == 409
+    status, cart = call(server, "PUT", "/cart/items/1", headers, {"quantity": 5})
+    assert cart["result"] == "updated"
+    assert call(server, "DELETE", "/cart/items/2", headers)[0] == 404
+
+    status, order = call(server, "POST", "/checkout", headers)
+    assert status == 200 and order["receipt"][-1].startswith("Final Total:")
+    assert server.catalog.get("P000001").stock == 0
+    assert call(server, "GET", "/cart", headers)[1]["items"] == []
+    with pytest.raises(HTTPError):
+        call(server, "GET", "/cart", {"x-session-id": "unknown"})
+
+
+def test_sessions_share_stock_and_release_on_end():
+    server = CartServer(demo_catalog(1, 4))
+    first, second = start_session(server), start_session(server)
+    call(server, "POST", "/cart/items", first, {"product_id": "P000000", "quantity": 3})
+    assert call(server, "POST", "/cart/items", second, {"product_id": "P000000", "quantity": 2})[0] == 409
+    call(server, "DELETE", "/sessions", first)
+    assert server.catalog.get("P000000").stock == 4
+    assert call(server, "POST", "/cart/items", second, {"product_id": "P000000", "quantity": 2})[0] == 200
+
+
+def test_ended_and_expired_sessions_detach_from_pricing():
+    clock = [0.0]
+    pricing = PricingEngine([BulkDiscount(10)])
+    server = CartServer(demo_catalog(5, 100), pricing, session_ttl=10)
+    server.reservations._clock = lambda: clock[0]
+    for _ in range(50):
+        headers = start_session(server)
+        call(server, "POST", "/cart/items", headers, {"product_id": "P000001", "quantity": 1})
+        call(server, "POST", "/checkout", headers)
+        call(server, "DELETE", "/sessions", headers)
+    headers = start_session(server)
+    clock[0] = 100.0
+    assert server.expire_sessions() == 1
+    assert server.sessions == {}
+    assert pricing._observers == []
+
+
+def test_store_keeps_held_units_across_restart(tmp_path):
+    db_path = str(tmp_path / "shop.db")
+    store = SQLiteStore(db_path)
+    store.save_products([[Product("P1", "Mouse", 10.0, 10)]])
+    catalog = Catalog()
+    load_catalog(db_path, catalog)
+    server = CartServer(catalog, store=store)
+    buyer, holder = start_session(server), start_session(server)
+    call(server, "POST", "/cart/items", buyer, {"product_id": "P1", "quantity": 2})
+    call(server, "POST", "/checkout", buyer)
+    call(server, "POST", "/cart/items", holder, {"product_id": "P1", "quantity": 3})
+    server.close()
+
+    connection = sqlite3.connect(db_path)
+    assert connection.execute("SELECT stock FROM products WHERE id = 'P1'").fetchone()[0] == 8
+    assert connection.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 1
+    connection.close()
+
+
+def test_bad_content_length_gets_400():
+    async def scenario():
+        server = CartServer(demo_catalog(1, 1))
+        listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        responses = []
+        for length in ("abc", "-5"):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"POST /sessions HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+            responses.append(await reader.read())
+            writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return responses
+
+    for response in asyncio.run(scenario()):
+        assert response.startswith(b"HTTP/1.1 400")
+
+
+class FailingStore:
+    def __init__(self):
+        self.fail = True
+        self.orders = []
+
+    def save_order(self, order_id, lines, total_paise, decrement_stock=False):
+        if self.fail:
+            raise sqlite3.OperationalError("database is locked")
+        self.orders.append((order_id, lines, total_paise))
+
+    def close(self):
+        pass
+
+
+def test_failed_order_save_keeps_the_cart():
+    store = FailingStore()
+    server = CartServer(demo_catalog(1, 5), store=store)
+    headers = start_session(server)
+    call(server, "POST", "/cart/items", headers, {"product_id": "P000000", "quantity": 2})
+    with pytest.raises(sqlite3.OperationalError):
+        call(server, "POST", "/checkout", headers)
+    service = server.sessions[headers["x-session-id"]]
+    assert service.cart.find("P000000").quantity == 2
+    assert server.reservations.held(service.cart, "P000000") == 2
+    assert not service.checkout_pending
+
+    store.fail = False
+    status, order = call(server, "POST", "/checkout", headers)
+    assert status == 200
+    assert [order_id for order_id, _, _ in store.orders] == [order["order"]]
+    assert call(server, "GET", "/cart", headers)[1]["items"] == []
+    assert server.catalog.get("P000000").stock == 3
+
+
+def test_slow_work_runs_off_the_event_loop():
+    saving, release = threading.Event(), threading.Event()
+
+    class SlowStore(FailingStore):
+        def save_order(self, *args, **kwargs):
+            saving.set()
+            release.wait(5)
+            self.orders.append(args)
+
+    server = CartServer(demo_catalog(20, 5), store=SlowStore())
+    building = threading.Event()
+    prepare_search = server.catalog.prepare_search
+
+    def slow_prepare_search():
+        building.wait(5)
+        prepare_search()
+    server.catalog.prepare_search = slow_prepare_search
+
+    async def scenario():
+        buyer, browser = await open_session(server), await open_session(server)
+        await request(server, "POST", "/cart/items", buyer, {"product_id": "P000001", "quantity": 1})
+        search = asyncio.ensure_future(request(server, "GET", "/products/search?q=product+1", browser))
+        checkout = asyncio.ensure_future(request(server, "POST", "/checkout", buyer))
+        while not saving.is_set():
+            await asyncio.sleep(0.01)
+        # Both slow requests are parked on the executor, yet other requests are still served
+        assert (await request(server, "GET", "/products?limit=1", browser))[0] == 200
+        assert (await request(server, "POST", "/cart/items", buyer, {"product_id": "P000002", "quantity": 1}))[0] == 409
+        assert not search.done()
+        building.set()
+        release.set()
+        status, payload = await search
+        assert status == 200 and payload["products"][0]["id"] == "P000001"
+        assert (await checkout)[0] == 200
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+import pytest
+
+from cart_engine import Product
+from snapshot import SnapshotCatalog, write_snapshot
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    products = [Product("P003", "Wireless Mouse", 25.0, 5, "Accessories"), Product("P001", "Laptop", 800.0, 2, "Computers"),
+                Product("P002", "Mouse Pad", 5.0, 9, "Accessories"), Product("P010", "Café Speaker", 60.0, 0, "Audio")]
+    path = str(tmp_path / "catalog.snap")
+    assert write_snapshot(products, path) == 4
+    catalog = SnapshotCatalog(path)
+    yield catalog
+    catalog.close()
+
+
+def test_round_trip(snapshot):
+    assert len(snapshot) == 4
+    assert [p.id for p in snapshot] == ["P003", "P001", "P002", "P010"]
+    product = snapshot.get("P010")
+    assert (product.name, product.price_paise, product.stock, product.category) == ("Café Speaker", 6000, 0, "Audio")
+    assert snapshot.get(" p002 ") is snapshot[2]
+    assert snapshot.get("p001").name == "Laptop"
+    assert snapshot.get("P004") is None
+    assert snapshot.get("P0") is None
+    assert snapshot.get("Z999") is None
+
+
+def test_duplicate_ids_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_snapshot([Product("P1", "A", 1.0, 1), Product("P2", "B", 1.0, 1), Product("p1", "C", 1.0, 1)], str(tmp_path / "dup.snap"))
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.snap"
+    path.write_bytes(b"not a snapshot" * 4)
+    with pytest.raises(ValueError):
+        SnapshotCatalog(str(path))
+
+
+def test_stock_changes_stick(snapshot):
+    assert list(snapshot.query("stock")) == [3, 1, 0, 2]
+    snapshot.adjust_stock(snapshot.get("P002"), -8)
+    assert snapshot._stock_at(2) == 1
+    assert snapshot.get("P002").stock == 1
+    assert list(snapshot.query("stock")) == [3, 2, 1, 0]
+    assert list(snapshot.query("price", stock_range=(1, 5))) == [2, 0, 1]
+
+
+def test_query_and_search(snapshot):
+    assert list(snapshot.query("name")) == [3, 1, 2, 0]
+    assert list(snapshot.query("price", descending=True)) == [1, 3, 0, 2]
+    assert [p.id for p in snapshot.search("mouse")] == ["P003", "P002"]
+    assert [p.id for p in snapshot.search("p00")] == ["P001", "P002", "P003"]
+    with pytest.raises(TypeError):
+        snapshot.add(Product("P020", "New", 1.0, 1))
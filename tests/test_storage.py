@@ -0,0 +1,65 @@
+import pytest
+
+from cart_engine import Cart, CartService, Catalog
+from storage import SQLiteStore, iter_csv_batches, load_catalog
+
+CSV = "id,name,price,stock,category\np001, Mouse ,25.50,5,Accessories\n\nP002,Laptop,800,2,Computers\nP003,Cable,1,0\n"
+
+
+def write_csv(tmp_path, text):
+    path = tmp_path / "catalog.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_load_csv(tmp_path):
+    catalog = Catalog()
+    rows, _ = load_catalog(write_csv(tmp_path, CSV), catalog, batch_size=2)
+    assert rows == 3
+    product = catalog.get("P001")
+    assert (product.name, product.price_paise, product.stock, product.category) == ("Mouse", 2550, 5, "Accessories")
+    assert catalog.get("P003").category == ""
+
+
+@pytest.mark.parametrize("row, message", [
+    ("P004,Pen,inf,1", "catalog.csv:2: malformed row"),
+    ("P004,Pen,1e400,1", "catalog.csv:2: malformed row"),
+    ("P004,Pen,abc,1", "catalog.csv:2: malformed row"),
+    ("P004,Pen", "catalog.csv:2: malformed row"),
+    (",Mouse,1,5", "catalog.csv:2: product ID is empty"),
+    ("  ,Mouse,1,5", "catalog.csv:2: product ID is empty"),
+    ("P004,Pen,0,1", "catalog.csv:2: price must be positive"),
+    ("P004,Pen,1,-1", "catalog.csv:2: price must be positive"),
+])
+def test_csv_rejects_bad_rows(tmp_path, row, message):
+    path = write_csv(tmp_path, f"id,name,price,stock\n{row}\n")
+    with pytest.raises(ValueError, match=message):
+        list(iter_csv_batches(path))
+
+
+def test_csv_requires_header(tmp_path):
+    with pytest.raises(ValueError, match="expected a header"):
+        list(iter_csv_batches(write_csv(tmp_path, "P001,Mouse,1,5\n")))
+
+
+def test_sqlite_round_trip(tmp_path):
+    db_path = str(tmp_path / "shop.db")
+    store = SQLiteStore(db_path)
+    assert store.save_products(iter_csv_batches(write_csv(tmp_path, CSV))) == 3
+    store.close()
+
+    catalog = Catalog()
+    assert load_catalog(db_path, catalog)[0] == 3
+    assert [p.id for p in catalog] == ["P001", "P002", "P003"]
+    service = CartService(catalog, Cart())
+    store = SQLiteStore(db_path)
+    store.watch(catalog, service.cart)
+    service.add("P001", 2)
+    store.close()
+
+    catalog = Catalog()
+    load_catalog(db_path, catalog)
+    assert catalog.get("P001").stock == 3
+    store = SQLiteStore(db_path)
+    assert [(p.id, quantity) for p, quantity in store.load_cart(catalog)] == [("P001", 2)]
+    store.close()